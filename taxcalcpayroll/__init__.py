@@ -1,10 +1,103 @@
 """
 Specify what is available to import from the taxcalc-payroll package.
+
+The names are imported lazily: a module of the package is imported only
+when one of its names is first used, so importing taxcalcpayroll does
+not import pandas, paramtools or taxcalc.  The __all__ list of names
+imported by "from taxcalcpayroll import *" is also made when first used,
+so a star import imports the same names as when the package itself
+star-imported the STAR_MODULES.
 """
 
-from taxcalcpayroll.calcfunctions import *
-from taxcalcpayroll.calculator import *
-from taxcalcpayroll.tcp import *
-from taxcalcpayroll.taxcalcio import *
+import types
+import importlib
+import importlib.util
 
 __version__ = "0.1.0"
+
+# modules whose public names are available from the package, in the
+# order they used to be star-imported, so that a name defined in more
+# than one of these modules comes from the last one
+STAR_MODULES = ["calcfunctions", "calculator", "sweep", "tcp", "taxcalcio"]
+
+# module defining each name that can be imported without looking in
+# the other STAR_MODULES
+LAZY_NAMES = {
+    "EI_PayrollTax": "calcfunctions",
+    "AdditionalMedicareTax": "calcfunctions",
+    "EI_PayrollTax_vec": "calcfunctions",
+    "AdditionalMedicareTax_vec": "calcfunctions",
+    "PayrollMTR_vec": "calcfunctions",
+    "Calculator": "calculator",
+    "set_aged_records_cache_size": "calculator",
+    "clear_aged_records_cache": "calculator",
+    "SWEEP_PARAMETERS": "sweep",
+    "payroll_sweep": "sweep",
+    "cli_tcp_main": "tcp",
+    "TaxCalcIO": "taxcalcio",
+    "OUTPUT_FORMATS": "taxcalcio",
+    "SQLDB_BATCH_SIZE": "taxcalcio",
+    "COLUMNAR_INPUT_EXTENSIONS": "taxcalcio",
+    "SQLiteDumpWriter": "taxcalcio",
+    "columnar_writer": "taxcalcio",
+    "read_columnar_file": "taxcalcio",
+    "read_input_file": "taxcalcio",
+}
+
+
+def __getattr__(name):
+    """
+    Return the value of name after importing the module that defines it.
+    """
+    if name == "__all__":
+        value = _public_names()
+    elif name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    elif name in LAZY_NAMES:
+        value = getattr(_import(LAZY_NAMES[name]), name)
+    elif importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        value = _import(name)
+    else:
+        # other names (for example, Records) that the STAR_MODULES import
+        for modname in reversed(STAR_MODULES):
+            module = _import(modname)
+            if not name.startswith("_") and name in vars(module):
+                value = vars(module)[name]
+                break
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    Return names available from the package, including those not imported.
+    """
+    return sorted(set(globals()) | set(LAZY_NAMES))
+
+
+def _import(modname):
+    """
+    Return the modname module of the package after importing it.
+    """
+    return importlib.import_module(f"{__name__}.{modname}")
+
+
+def _public_names():
+    """
+    Return sorted list of the public names of the STAR_MODULES and of the
+    package modules imported by them, which are the names that a star
+    import of the package used to import.
+    """
+    names = set(LAZY_NAMES)
+    for modname in STAR_MODULES:
+        module = _import(modname)
+        names.update(name for name in vars(module) if not name.startswith("_"))
+    names.update(
+        name
+        for name, value in globals().items()
+        if isinstance(value, types.ModuleType)
+        and value.__name__.startswith(__name__ + ".")
+    )
+    return sorted(names)
@@ -22,8 +22,9 @@ indexing).
 import math
 import copy
 import numpy as np
-from taxcalc.decorators import iterate_jit, JIT
+from taxcalc.decorators import JIT
 import taxcalc as tc
+from taxcalcpayroll.decorators import iterate_jit, apply_numpy
 
 
 @iterate_jit(nopython=True)
@@ -321,3 +322,318 @@ def AdditionalMedicareTax(
     )
     payrolltax += ptax_amc
     return (ptax_amc, payrolltax)
+
+
+@apply_numpy
+def EI_PayrollTax_vec(
+    SS_Earnings_c,
+    e00200p,
+    e00200s,
+    pencon_p,
+    pencon_s,
+    FICA_ss_trt_employer,
+    FICA_ss_trt_employee,
+    FICA_mc_trt_employer,
+    FICA_mc_trt_employee,
+    ALD_SelfEmploymentTax_hc,
+    SS_Earnings_thd,
+    SECA_Earnings_thd,
+    e00900p,
+    e00900s,
+    e02100p,
+    e02100s,
+    k1bx14p,
+    k1bx14s,
+    payrolltax,
+    ptax_was,
+    setax,
+    c03260,
+    ptax_oasdi,
+    sey,
+    earned,
+    earned_p,
+    earned_s,
+    was_plus_sey_p,
+    was_plus_sey_s,
+):
+    """
+    Whole-array NumPy version of the EI_PayrollTax function.
+
+    Computes exactly the same values as EI_PayrollTax, but does so with
+    NumPy array operations on all filing units at once instead of with a
+    (possibly numba-compiled) loop over filing units.  See EI_PayrollTax
+    for documentation of the parameters and returned variables.
+
+    The policy parameter arguments can also be column arrays holding one
+    value for each of several policies, in which case each returned array
+    has one row for each policy (see Calculator.calc_payroll_batch).
+    """
+    # compute sey and its individual components
+    sey_p = e00900p + e02100p + k1bx14p
+    sey_s = e00900s + e02100s + k1bx14s
+    sey = sey_p + sey_s  # total self-employment income for filing unit
+
+    # compute gross wage and salary income ('was' denotes 'wage and salary')
+    gross_was_p = e00200p + pencon_p
+    gross_was_s = e00200s + pencon_s
+
+    # compute taxable gross earnings for OASDI FICA
+    txearn_was_p = np.minimum(SS_Earnings_c, gross_was_p)
+    txearn_was_s = np.minimum(SS_Earnings_c, gross_was_s)
+
+    # compute OASDI and HI payroll taxes on wage-and-salary income, FICA
+    ptax_ss_was_p = (FICA_ss_trt_employer + FICA_ss_trt_employee) * txearn_was_p
+    ptax_ss_was_s = (FICA_ss_trt_employer + FICA_ss_trt_employee) * txearn_was_s
+    ptax_mc_was_p = (FICA_mc_trt_employer + FICA_mc_trt_employee) * gross_was_p
+    ptax_mc_was_s = (FICA_mc_trt_employer + FICA_mc_trt_employee) * gross_was_s
+    ptax_was = ptax_ss_was_p + ptax_ss_was_s + ptax_mc_was_p + ptax_mc_was_s
+
+    # compute taxable self-employment income for OASDI SECA
+    sey_frac = 1.0 - 0.5 * (
+        FICA_ss_trt_employer
+        + FICA_ss_trt_employee
+        + FICA_mc_trt_employer
+        + FICA_mc_trt_employee
+    )
+    txearn_sey_p = np.minimum(
+        np.maximum(0.0, sey_p * sey_frac), SS_Earnings_c - txearn_was_p
+    )
+    txearn_sey_s = np.minimum(
+        np.maximum(0.0, sey_s * sey_frac), SS_Earnings_c - txearn_was_s
+    )
+
+    # compute self-employment tax on taxable self-employment income, SECA
+    setax_ss_p = (FICA_ss_trt_employer + FICA_ss_trt_employee) * txearn_sey_p
+    setax_ss_s = (FICA_ss_trt_employer + FICA_ss_trt_employee) * txearn_sey_s
+    setax_mc_p = (FICA_mc_trt_employer + FICA_mc_trt_employee) * np.maximum(
+        0.0, sey_p * sey_frac
+    )
+    setax_mc_s = (FICA_mc_trt_employer + FICA_mc_trt_employee) * np.maximum(
+        0.0, sey_s * sey_frac
+    )
+    setax_p = setax_ss_p + setax_mc_p
+    setax_s = setax_ss_s + setax_mc_s
+    # no tax if low amount of self-employment income
+    setax = np.where(sey * sey_frac > SECA_Earnings_thd, setax_p + setax_s, 0.0)
+
+    # compute extra OASDI payroll taxes on the portion of the sum
+    # of wage-and-salary income and taxable self employment income
+    # that exceeds SS_Earnings_thd
+    sey_frac = 1.0 - 0.5 * (FICA_ss_trt_employer + FICA_ss_trt_employee)
+    was_plus_sey_p = gross_was_p + np.maximum(0.0, sey_p * sey_frac)
+    was_plus_sey_s = gross_was_s + np.maximum(0.0, sey_s * sey_frac)
+    extra_ss_income_p = np.maximum(0.0, was_plus_sey_p - SS_Earnings_thd)
+    extra_ss_income_s = np.maximum(0.0, was_plus_sey_s - SS_Earnings_thd)
+    extra_payrolltax = extra_ss_income_p * (
+        FICA_ss_trt_employer + FICA_ss_trt_employee
+    ) + extra_ss_income_s * (FICA_ss_trt_employer + FICA_ss_trt_employee)
+
+    # compute part of total payroll taxes for filing unit
+    # (the ptax_amc part of total payroll taxes for the filing unit is
+    # computed in the AdditionalMedicareTax_vec function below)
+    payrolltax = ptax_was + setax + extra_payrolltax
+
+    # compute OASDI part of payroll taxes
+    ptax_oasdi = (
+        ptax_ss_was_p + ptax_ss_was_s + setax_ss_p + setax_ss_s + extra_payrolltax
+    )
+
+    # compute earned* variables and AGI deduction for
+    # "employer share" of self-employment tax, c03260
+    c03260 = (1.0 - ALD_SelfEmploymentTax_hc) * 0.5 * setax
+    earned = np.maximum(0.0, e00200p + e00200s + sey - c03260)
+    earned_p = np.maximum(
+        0.0, (e00200p + sey_p - (1.0 - ALD_SelfEmploymentTax_hc) * 0.5 * setax_p)
+    )
+    earned_s = np.maximum(
+        0.0, (e00200s + sey_s - (1.0 - ALD_SelfEmploymentTax_hc) * 0.5 * setax_s)
+    )
+    return (
+        sey,
+        payrolltax,
+        ptax_was,
+        setax,
+        c03260,
+        ptax_oasdi,
+        earned,
+        earned_p,
+        earned_s,
+        was_plus_sey_p,
+        was_plus_sey_s,
+    )
+
+
+@apply_numpy
+def AdditionalMedicareTax_vec(
+    e00200,
+    MARS,
+    AMEDT_ec,
+    sey,
+    AMEDT_rt,
+    FICA_mc_trt_employer,
+    FICA_mc_trt_employee,
+    FICA_ss_trt_employer,
+    FICA_ss_trt_employee,
+    ptax_amc,
+    payrolltax,
+):
+    """
+    Whole-array NumPy version of the AdditionalMedicareTax function.
+
+    Computes exactly the same values as AdditionalMedicareTax, but does
+    so with NumPy array operations on all filing units at once, using
+    MARS - 1 as an index into the last axis of AMEDT_ec to look up each
+    unit's exclusion.  See AdditionalMedicareTax for documentation of the
+    parameters and returned variables.
+    """
+    line8 = np.maximum(0.0, sey) * (
+        1.0
+        - 0.5
+        * (
+            FICA_mc_trt_employer
+            + FICA_mc_trt_employee
+            + FICA_ss_trt_employer
+            + FICA_ss_trt_employee
+        )
+    )
+    amedt_ec = np.take(AMEDT_ec, MARS - 1, axis=-1)
+    line11 = np.maximum(0.0, amedt_ec - e00200)
+    ptax_amc = AMEDT_rt * (
+        np.maximum(0.0, e00200 - amedt_ec) + np.maximum(0.0, line8 - line11)
+    )
+    payrolltax = payrolltax + ptax_amc
+    return (ptax_amc, payrolltax)
+
+
+def PayrollMTR_vec(
+    mtr_variable,
+    wrt_full_compensation,
+    SS_Earnings_c,
+    e00200p,
+    e00200s,
+    pencon_p,
+    pencon_s,
+    FICA_ss_trt_employer,
+    FICA_ss_trt_employee,
+    FICA_mc_trt_employer,
+    FICA_mc_trt_employee,
+    SS_Earnings_thd,
+    SECA_Earnings_thd,
+    e00900p,
+    e00900s,
+    e02100p,
+    e02100s,
+    k1bx14p,
+    k1bx14s,
+    e00200,
+    MARS,
+    AMEDT_ec,
+    AMEDT_rt,
+):
+    """
+    Computes marginal payroll tax rates in closed form with NumPy array
+    operations on all filing units at once.
+
+    The EI_PayrollTax and AdditionalMedicareTax functions are piecewise
+    linear in earnings, so the marginal payroll tax rate is the sum of the
+    FICA, SECA and Additional Medicare Tax rates on the segments of those
+    functions that contain each filing unit.  At a kink the rate on the
+    segment just above the kink is used, so the rates are the same as the
+    finite-difference rates computed by the Calculator.mtr method except
+    at the SECA_Earnings_thd threshold (where self-employment tax jumps
+    from zero) and within a finite difference of a kink.
+
+    Parameters
+    ----------
+    mtr_variable: string
+        Name of the income variable that is increased: one of e00200p,
+        e00200s, e00900p and k1bx14p changes payroll taxes; any other
+        Calculator.MTR_VALID_VARIABLES variable has a zero marginal
+        payroll tax rate
+    wrt_full_compensation: boolean
+        Whether or not marginal tax rates on wages and salaries are
+        computed with respect to changes in total compensation that
+        includes the employer share of OASDI and HI payroll taxes
+    MARS: int
+        Filing marital status (1=single, 2=joint, 3=separate, 4=household-head, 5=widow(er))
+    AMEDT_ec: list
+        Additional Medicare Tax earnings exclusion
+    AMEDT_rt: float
+        Additional Medicare Tax rate
+    e00200: float
+        Wages and salaries
+
+    See EI_PayrollTax for documentation of the other parameters.
+
+    Returns
+    -------
+    mtr_payrolltax: float
+        Marginal payroll tax rate, which is NaN for units with MARS != 2
+        when mtr_variable is e00200s
+    """
+    ss_rate = FICA_ss_trt_employer + FICA_ss_trt_employee
+    mc_rate = FICA_mc_trt_employer + FICA_mc_trt_employee
+    sey_frac = 1.0 - 0.5 * (ss_rate + mc_rate)
+    sey_frac_ss = 1.0 - 0.5 * ss_rate
+
+    # compute the unit-level variables that determine which segment
+    # of the SECA and Additional Medicare Tax formulas contains the unit
+    sey = e00900p + e02100p + k1bx14p + e00900s + e02100s + k1bx14s
+    seca_taxed = sey * sey_frac > SECA_Earnings_thd
+    amedt_ec = np.take(AMEDT_ec, MARS - 1, axis=-1)
+    line8 = np.maximum(0.0, sey) * sey_frac
+    line11 = np.maximum(0.0, amedt_ec - e00200)
+    amc_taxed = line8 >= line11
+
+    # compute the earnings of the person whose income is increased
+    if mtr_variable == "e00200s":
+        gross_was = e00200s + pencon_s
+        sey_own = e00900s + e02100s + k1bx14s
+    else:
+        gross_was = e00200p + pencon_p
+        sey_own = e00900p + e02100p + k1bx14p
+    txearn_was = np.minimum(SS_Earnings_c, gross_was)
+    uncapped_sey = np.maximum(0.0, sey_own * sey_frac)
+    sey_room = SS_Earnings_c - txearn_was  # OASDI-taxable room left for sey
+    extra_taxed = gross_was + np.maximum(0.0, sey_own * sey_frac_ss) >= SS_Earnings_thd
+
+    # compute the change in payroll taxes per dollar of income
+    if mtr_variable in ("e00200p", "e00200s"):
+        below_cap = gross_was < SS_Earnings_c
+        # higher wages below the OASDI maximum reduce the taxable
+        # self-employment income of a person whose SECA tax is capped
+        crowd_out = below_cap & seca_taxed & (uncapped_sey >= sey_room)
+        dptax = (
+            ss_rate * below_cap
+            + mc_rate
+            - ss_rate * crowd_out
+            + ss_rate * extra_taxed
+            + AMEDT_rt * amc_taxed
+        )
+    elif mtr_variable in ("e00900p", "k1bx14p"):
+        sey_own_pos = sey_own >= 0.0
+        sey_pos = sey >= 0.0
+        setax_rate = sey_frac * (ss_rate * (uncapped_sey < sey_room) + mc_rate)
+        dptax = (
+            np.where(seca_taxed & sey_own_pos, setax_rate, 0.0)
+            + ss_rate * sey_frac_ss * (extra_taxed & sey_own_pos)
+            + AMEDT_rt * sey_frac * (amc_taxed & sey_pos)
+        )
+    else:
+        dptax = np.zeros_like(e00200)
+
+    # specify optional adjustment for employer (er) OASDI+HI payroll taxes
+    if wrt_full_compensation and mtr_variable in ("e00200p", "e00200s"):
+        if mtr_variable == "e00200s":
+            earnings = e00200s
+        else:
+            earnings = e00200p
+        oasdi_taxed = np.logical_or(
+            earnings < SS_Earnings_c, earnings >= SS_Earnings_thd
+        )
+        adj = np.where(oasdi_taxed, 0.5 * (ss_rate + mc_rate), 0.5 * mc_rate)
+    else:
+        adj = 0.0
+    if mtr_variable == "e00200s":
+        dptax = np.where(MARS == 2, dptax, np.nan)
+    return dptax / (1.0 + adj)
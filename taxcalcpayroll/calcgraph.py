@@ -0,0 +1,147 @@
+"""
+Taxcalc-Payroll graph of the Records variables used and set by the
+functions in the calcfunctions.py modules.
+"""
+
+# CODING-STYLE CHECKS:
+# pycodestyle calcgraph.py
+# pylint --disable=locally-disabled calcgraph.py
+
+import ast
+import inspect
+import functools
+import taxcalc.calcfunctions
+from taxcalc.records import Records
+import taxcalcpayroll.calcfunctions
+
+
+# modules containing the functions called by the Calculator class methods
+CALC_FUNCTION_MODULES = [taxcalc.calcfunctions, taxcalcpayroll.calcfunctions]
+
+# decorators that make a calc-style function into an apply-style function
+APPLY_DECORATORS = ["iterate_jit", "apply_numpy"]
+
+
+@functools.lru_cache(maxsize=None)
+def calc_function_variables():
+    """
+    Return dictionary whose keys are the names of the apply-style
+    functions in the CALC_FUNCTION_MODULES (in the order they appear in
+    those modules) and whose values are (inputs, outputs) tuples of
+    frozensets of the names of the Records variables each function uses
+    and sets.
+
+    The variables of a calc-style function decorated with iterate_jit or
+    apply_numpy are its arguments and the names in its return statement,
+    so policy parameter arguments are left out.  The variables of a
+    function whose first argument is a Calculator object named calc are
+    the constant names in its calc.array and calc.incarray calls.
+    """
+    varinfo = Records(data=None)
+    records_vars = varinfo.USABLE_READ_VARS | varinfo.CALCULATED_VARS
+    functions = dict()
+    for module in CALC_FUNCTION_MODULES:
+        tree = ast.parse(inspect.getsource(module))
+        for node in tree.body:
+            if not isinstance(node, ast.FunctionDef):
+                continue
+            args = [arg.arg for arg in node.args.args]
+            if _decorator_names(node) & set(APPLY_DECORATORS):
+                inputs = set(args)
+                outputs = _return_names(node)
+            elif args and args[0] == "calc":
+                inputs, outputs = _calc_array_names(node)
+            else:
+                continue
+            functions[node.name] = (
+                frozenset(inputs & records_vars),
+                frozenset(outputs & records_vars),
+            )
+    return functions
+
+
+def required_read_variables(output_vars):
+    """
+    Return set of names of the Records read variables on which the
+    output_vars Records variables depend, which are found by walking
+    back from output_vars through the variables used and set by the
+    functions in the calc_function_variables() dictionary.  Each of
+    the output_vars that is itself a read variable is included.
+    """
+    varinfo = Records(data=None)
+    unknown = set(output_vars) - (
+        varinfo.USABLE_READ_VARS | varinfo.CALCULATED_VARS
+    )
+    if unknown:
+        msg = "output_vars contains unknown Records variables: {}"
+        raise ValueError(msg.format(sorted(unknown)))
+    functions = calc_function_variables().values()
+    needed = set()
+    pending = list(output_vars)
+    while pending:
+        var = pending.pop()
+        if var in needed:
+            continue
+        needed.add(var)
+        for inputs, outputs in functions:
+            if var in outputs:
+                pending.extend(inputs - needed)
+    return needed & varinfo.USABLE_READ_VARS
+
+
+def _decorator_names(node):
+    """
+    Return set of names of the decorators of the function node.
+    """
+    names = set()
+    for dec in node.decorator_list:
+        if isinstance(dec, ast.Call):
+            dec = dec.func
+        if isinstance(dec, ast.Name):
+            names.add(dec.id)
+        elif isinstance(dec, ast.Attribute):
+            names.add(dec.attr)
+    return names
+
+
+def _return_names(node):
+    """
+    Return set of names in the first return statement of the function node.
+    """
+    for subnode in ast.walk(node):
+        if isinstance(subnode, ast.Return) and subnode.value is not None:
+            value = subnode.value
+            if isinstance(value, ast.Tuple):
+                return set(elt.id for elt in value.elts if isinstance(elt, ast.Name))
+            if isinstance(value, ast.Name):
+                return {value.id}
+    return set()
+
+
+def _calc_array_names(node):
+    """
+    Return (inputs, outputs) tuple of sets of the constant variable names
+    in the calc.array and calc.incarray calls in the function node.
+    """
+    inputs = set()
+    outputs = set()
+    for subnode in ast.walk(node):
+        if not (
+            isinstance(subnode, ast.Call)
+            and isinstance(subnode.func, ast.Attribute)
+            and isinstance(subnode.func.value, ast.Name)
+            and subnode.func.value.id == "calc"
+            and subnode.func.attr in ("array", "incarray")
+            and subnode.args
+            and isinstance(subnode.args[0], ast.Constant)
+        ):
+            continue
+        name = subnode.args[0].value
+        if subnode.func.attr == "incarray":
+            inputs.add(name)
+            outputs.add(name)
+        elif len(subnode.args) > 1:
+            outputs.add(name)
+        else:
+            inputs.add(name)
+    return (inputs, outputs)
@@ -0,0 +1,255 @@
+"""
+Implement the decorators used to apply the Taxcalc-Payroll functions in
+the calcfunctions.py module: an iterate_jit decorator that can cache the
+numba-compiled functions on disk and a decorator used to apply the
+whole-array NumPy versions of those functions.
+"""
+
+# CODING-STYLE CHECKS:
+# pycodestyle decorators.py
+# pylint --disable=locally-disabled decorators.py
+
+import os
+import ast
+import sys
+import inspect
+import hashlib
+import textwrap
+import functools
+import importlib.util
+import numba
+import taxcalc.decorators
+from taxcalc.decorators import (
+    GetReturnNode,
+    create_apply_function_string,
+    create_toplevel_function_string,
+)
+from taxcalc.policy import Policy
+
+
+# Name of the environment variable that turns on the on-disk caching of
+# numba-compiled calcfunctions.  Its value is the cache directory, which
+# must be set before the taxcalcpayroll package is imported.
+JIT_CACHE_ENV = "TCPJITCACHE"
+
+
+def _return_names(func):
+    """
+    Return list of names in the return statement of func.
+    """
+    src = inspect.getsource(func)
+    grn = GetReturnNode()
+    out_args = None
+    for node in ast.walk(ast.parse(textwrap.dedent(src))):
+        out_args = grn.visit(node)
+        if out_args:
+            break
+    if not out_args:
+        raise ValueError("Can't find return statement in function!")
+    return out_args
+
+
+def create_cached_module_string(func, out_args, in_args, parameters, **kwargs):
+    """
+    Create a string containing the source code of a Python module that
+    defines the calc-style func as jitted_f and the apply-style function
+    that loops over filing units as ap_func, both of which are compiled
+    by numba with cache=True so the compiled code is saved on disk.
+
+    Parameters
+    ----------
+    func: the calc-style function
+
+    out_args: list of out arguments for the apply-style function
+
+    in_args: list of in arguments for the apply-style function
+
+    parameters: iterable of which of the args (from in_args) are parameter
+                variables (as opposed to column records)
+
+    kwargs: numba.jit arguments
+
+    Returns
+    -------
+    a String representing the module
+    """
+    src_lines = textwrap.dedent(inspect.getsource(func)).splitlines()
+    while not src_lines[0].startswith("def "):
+        src_lines.pop(0)  # remove decorator lines
+    jit_args = dict(kwargs)
+    jit_args["cache"] = True
+    jit_call = "numba.jit(**{!r})".format(jit_args)
+    lines = [
+        '"""',
+        "Module generated by taxcalcpayroll.decorators; do not edit.",
+        "numba {}: {}.{}".format(numba.__version__, func.__module__, func.__name__),
+        '"""',
+        "# pylint: skip-file",
+        "import math",
+        "import numpy as np",
+        "import numba",
+        "",
+        "",
+        "@" + jit_call,
+    ]
+    lines.extend(src_lines)
+    lines.extend(["", "", "jitted_f = {}".format(func.__name__), "", ""])
+    lines.append("@" + jit_call)
+    lines.append(create_apply_function_string(out_args, in_args, parameters))
+    return "\n".join(lines)
+
+
+def load_cached_module(modstr, name, cache_dir):
+    """
+    Write the module source code in modstr to the cache_dir directory,
+    unless it is already there, and import that module.  The file name
+    contains a hash of modstr, which includes the calc-style function
+    source code and the numba version, so a change in either one causes
+    the function to be recompiled instead of loaded from the cache.
+    """
+    digest = hashlib.sha256(modstr.encode("utf-8")).hexdigest()[:16]
+    modname = "tcpjit_{}_{}".format(name, digest)
+    if modname in sys.modules:
+        return sys.modules[modname]
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, modname + ".py")
+    if not os.path.isfile(path):
+        # write to a temporary file first so that concurrent processes
+        # never import a partially written module
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as mfile:
+            mfile.write(modstr)
+        os.replace(tmp_path, path)
+    spec = importlib.util.spec_from_file_location(modname, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[modname] = module
+    return module
+
+
+def iterate_jit(parameters=None, **kwargs):
+    """
+    Public decorator for a calc-style function (see calcfunctions.py) that
+    transforms the calc-style function into an apply-style function that
+    can be called by Calculator class methods (see calculator.py).
+
+    When the TCPJITCACHE environment variable is not set (or numba JIT is
+    turned off), this is the same as the Tax-Calculator iterate_jit
+    decorator.  When TCPJITCACHE is set to a directory name, the
+    numba-compiled function is cached in that directory, so only the
+    first Python process that uses the function pays the compile cost.
+    """
+    cache_dir = os.environ.get(JIT_CACHE_ENV, "")
+    do_jit = taxcalc.decorators.JIT is not taxcalc.decorators.id_wrapper
+    if not cache_dir or not do_jit:
+        return taxcalc.decorators.iterate_jit(parameters=parameters, **kwargs)
+    if not parameters:
+        parameters = []
+
+    def make_wrapper(func):
+        """
+        make_wrapper function nested in iterate_jit decorator.
+        """
+        in_args = inspect.getfullargspec(func).args
+        # get the numba.jit arguments
+        jit_args_list = inspect.getfullargspec(numba.jit).args + ["nopython"]
+        kwargs_for_jit = dict()
+        for key, val in kwargs.items():
+            if key in jit_args_list:
+                kwargs_for_jit[key] = val
+        # identify the policy parameters in the same way as taxcalc
+        param_list = Policy.parameter_list()
+        allowed_parameters = param_list
+        allowed_parameters += list(arg[1:] for arg in param_list)
+        all_parameters = [arg for arg in in_args if arg in allowed_parameters]
+        all_parameters = list(set(all_parameters + list(parameters)))
+        all_out_args = _return_names(func)
+        modstr = create_cached_module_string(
+            func,
+            list(reversed(all_out_args)),
+            in_args,
+            all_parameters,
+            **kwargs_for_jit
+        )
+        applied_jitted_f = load_cached_module(
+            modstr, func.__name__, cache_dir
+        ).ap_func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            """
+            wrapper function nested in make_wrapper function nested
+            in iterate_jit decorator.
+            """
+            # os TESTING environment only accepts string arguments
+            if os.getenv("TESTING") == "True":
+                return func(*args, **kwargs)
+            pm_or_pf = []
+            for farg in all_out_args + in_args:
+                if hasattr(args[0], farg):
+                    pm_or_pf.append("pm")
+                elif hasattr(args[1], farg):
+                    pm_or_pf.append("pf")
+            # create the high level function
+            high_level_func = create_toplevel_function_string(
+                all_out_args, list(in_args), pm_or_pf
+            )
+            func_code = compile(high_level_func, "<string>", "exec")
+            fakeglobals = {}
+            eval(  # pylint: disable=eval-used
+                func_code, {"applied_f": applied_jitted_f}, fakeglobals
+            )
+            high_level_fn = fakeglobals["hl_func"]
+            return high_level_fn(*args, **kwargs)
+
+        return wrapper
+
+    return make_wrapper
+
+
+def apply_numpy(func):
+    """
+    Public decorator for a whole-array calc-style function (see the *_vec
+    functions in calcfunctions.py) that transforms it into an apply-style
+    function that can be called by Calculator class methods in exactly
+    the same way as an iterate_jit-decorated function, that is, as
+    func(policy, records).
+
+    Unlike iterate_jit, the decorated function is not compiled and does
+    not loop over filing units: it is called once with whole Records
+    arrays and current-year Policy parameter values, so there is neither
+    a per-record Python loop nor a numba JIT compile cost.  The returned
+    values are stored in place in the existing Records arrays.
+
+    The undecorated function is available as the __wrapped__ attribute
+    and the list of names of the variables it returns is available as
+    the out_args attribute.
+    """
+    in_args = inspect.getfullargspec(func).args
+    out_args = _return_names(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        """
+        wrapper function nested in apply_numpy decorator.
+        """
+        # os TESTING environment only accepts string arguments
+        if os.getenv("TESTING") == "True":
+            return func(*args, **kwargs)
+        pol, rec = args
+        in_arrays = list()
+        for farg in in_args:
+            if hasattr(pol, farg):
+                # bring Policy parameter values down a dimension
+                in_arrays.append(getattr(pol, farg)[0])
+            else:
+                in_arrays.append(getattr(rec, farg))
+        outputs = func(*in_arrays)
+        if len(out_args) == 1:
+            outputs = (outputs,)
+        for farg, value in zip(out_args, outputs):
+            getattr(rec, farg)[:] = value
+        return None
+
+    wrapper.out_args = out_args
+    return wrapper
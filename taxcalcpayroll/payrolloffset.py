@@ -6,6 +6,11 @@ import copy
 import numpy as np
 import taxcalc as tc
 import taxcalcpayroll as tcp
+from taxcalcpayroll.policy import Policy as TCPPolicy
+
+
+# Records input variables changed by the employer side payroll tax offset
+OFFSET_VARIABLES = ["e00200p", "e00200s", "pencon_p", "pencon_s", "e00200"]
 
 
 def employer_payroll_offset(reform, ccalc, cpolicy, rrecs, dump=False):
@@ -70,22 +75,14 @@ def employer_payroll_offset(reform, ccalc, cpolicy, rrecs, dump=False):
     Especially, when conducting multi-year analysis
 
     """
-    # Check if the employer side payroll tax parameters are changed in this reform
-    if (
-        reform.get("FICA_ss_trt_employer")
-        or reform.get("FICA_mc_trt_employer") is not None
-    ):
+    _check_arguments(reform, ccalc, cpolicy, rrecs)
+    if _employer_rates_changed(reform):
 
         # make deep copy for the calculator variable from the argument, to be used internally only; their value will not be changed outside of this function
         # To be noticed calc is a tool calculator object. It does not represent the calculator object after the implementation of offset (problems will appear when doing multi year analysis)
         calc = copy.deepcopy(ccalc)
-        dpolicy = copy.deepcopy(cpolicy)
+        dpolicy = TCPPolicy.clone(cpolicy)
         drecs = copy.deepcopy(rrecs)
-        # Check function argument types
-        assert isinstance(calc, tc.Calculator) | isinstance(calc, tcp.Calculator)
-        assert isinstance(reform, dict)
-        assert isinstance(dpolicy, tc.Policy)
-        assert isinstance(drecs, tc.Records)
 
         # make copy of the employer side payroll tax rate before the reform
         rate1_FICA_mc_trt_employer = calc.policy_param("FICA_mc_trt_employer")
@@ -94,116 +91,17 @@ def employer_payroll_offset(reform, ccalc, cpolicy, rrecs, dump=False):
         # implement the reform
         CYR = calc.current_year
         dpolicy.implement_reform(reform, print_warnings=False, raise_errors=False)
-        calc = tc.Calculator(policy=dpolicy, records=drecs)
+        calc = tcp.Calculator(policy=dpolicy, records=drecs)
         calc.advance_to_year(CYR)
         calc.calc_all()
 
-        # make copy of the employer side payroll tax rate after the reform
-        rate2_FICA_mc_trt_employer = calc.policy_param("FICA_mc_trt_employer")
-        rate2_FICA_ss_trt_employer = calc.policy_param("FICA_ss_trt_employer")
-
-        # Calculate the employer side payroll tax offset rate
-        offset_rate = (1 + rate1_FICA_mc_trt_employer + rate1_FICA_ss_trt_employer) / (
-            1 + rate2_FICA_mc_trt_employer + rate2_FICA_ss_trt_employer
-        )
-        # wage & income above this maximum of OASDI taxable value will be taxed at this value, instead of the value of wage
-        taxmax = calc.policy_param("SS_Earnings_c")
-
-        # Implement the employer payroll tax offset upon individual taxpayers e00200p, e00200s, pencon_p, pencon_s
-        # e00200 the filling unit will be calculated based upon e00200p and e00200s
-
-        pre_wage_p = calc.array("e00200p")
-        pre_pencon_p = calc.array("pencon_p")
-
-        pre_wp_p = pre_wage_p + pre_pencon_p
-        # assume the ratio of wage to gross wage will remain the same; the `+$1` is to avoid the $0 condition
-        wage_ratio_p = (pre_wage_p + 1) / (pre_wp_p + 1)
-        # check if the taxpaer's gross wage is above or below the maximum OASDI taxable value
-        oasdi_capped_p = pre_wp_p < taxmax
-
-        # Calculate the offset for the taxpayer's gross wage which is above the maximum OASDI taxable value
-        total_comp_above_line_p = (
-            1 + rate1_FICA_mc_trt_employer
-        ) * pre_wp_p + rate1_FICA_ss_trt_employer * taxmax
-        new_wp_above_line_p = (
-            total_comp_above_line_p - rate2_FICA_ss_trt_employer * taxmax
-        ) / (1 + rate2_FICA_mc_trt_employer)
-        new_wage_above_line_p = wage_ratio_p * new_wp_above_line_p
-        new_pencon_above_line_p = (1 - wage_ratio_p) * new_wp_above_line_p
-
-        # Calculate the offset for the taxpayer's wage & income which is below the maximum OASDI taxable value
-        new_wage_below_line_p = pre_wage_p * offset_rate
-        new_wage_p = np.where(
-            oasdi_capped_p, new_wage_below_line_p, new_wage_above_line_p
-        )
-
-        # Calculate the offset for the taxpayer's pencon which is below the maximum OASDI taxable value
-        new_pencon_below_line_p = pre_pencon_p * offset_rate
-        new_pencon_p = np.where(
-            oasdi_capped_p, new_pencon_below_line_p, new_pencon_above_line_p
-        )
-
-        calc.zeroarray("e00200p")
-        calc.incarray("e00200p", new_wage_p)
-
-        calc.zeroarray("pencon_p")
-        calc.incarray("pencon_p", new_pencon_p)
-
-
-
-        pre_wage_s = calc.array("e00200s")
-        pre_pencon_s = calc.array("pencon_s")
+        _apply_offset(calc, rate1_FICA_mc_trt_employer, rate1_FICA_ss_trt_employer)
 
-        pre_wp_s = pre_wage_s + pre_pencon_s
-        # assume the ratio of wage to gross wage will remain the same; the `+$1` is to avoid the $0 condition
-        wage_ratio_s = (pre_wage_s + 1) / (pre_wp_s + 1)
-        # check if the taxpaer's gross wage is above or below the maximum OASDI taxable value
-        oasdi_capped_s = pre_wp_s < taxmax
-
-        # Calculate the offset for the taxpayer's gross wage which is above the maximum OASDI taxable value
-        total_comp_above_line_s = (
-            1 + rate1_FICA_mc_trt_employer
-        ) * pre_wp_s + rate1_FICA_ss_trt_employer * taxmax
-        new_wp_above_line_s = (
-            total_comp_above_line_s - rate2_FICA_ss_trt_employer * taxmax
-        ) / (1 + rate2_FICA_mc_trt_employer)
-        new_wage_above_line_s = wage_ratio_s * new_wp_above_line_s
-        new_pencon_above_line_s = (1 - wage_ratio_s) * new_wp_above_line_s
-
-        # Calculate the offset for the taxpayer's wage & income which is below the maximum OASDI taxable value
-        new_wage_below_line_s = pre_wage_s * offset_rate
-        new_wage_s = np.where(
-            oasdi_capped_s, new_wage_below_line_s, new_wage_above_line_s
-        )
-
-        # Calculate the offset for the taxpayer's pencon which is below the maximum OASDI taxable value
-        new_pencon_below_line_s = pre_pencon_s * offset_rate
-        new_pencon_s = np.where(
-            oasdi_capped_s, new_pencon_below_line_s, new_pencon_above_line_s
-        )
-
-        calc.zeroarray("e00200s")
-        calc.incarray("e00200s", new_wage_s)
-
-        calc.zeroarray("pencon_s")
-        calc.incarray("pencon_s", new_pencon_s)
-
-
-        # note: e00200 is calculated through e00200 = e00200p + e00200s, instead of multiplying the offset rate which may cause this equation not held because of the decimial issues
-        new_wage = new_wage_s + new_wage_p
-        calc.zeroarray("e00200")
-        calc.incarray("e00200", new_wage)
-
-        calc.calc_all()
+        # recalculate only the calc_all steps that depend on the offset variables
+        calc.recalc(OFFSET_VARIABLES)
 
         # extract dataframe from calc
-        if dump:
-            recs_vinfo = tc.Records(data=None)  # contains records VARINFO only
-            dvars = list(recs_vinfo.USABLE_READ_VARS | recs_vinfo.CALCULATED_VARS)
-            df = calc.dataframe(dvars)
-
-        else:
-            df = calc.dataframe(tc.DIST_VARIABLES)
+        df = _offset_dataframe(calc, dump)
 
         # delete the tool calculator
         del calc
@@ -214,23 +112,212 @@ def employer_payroll_offset(reform, ccalc, cpolicy, rrecs, dump=False):
     # If there is no change upon the empoyersie payroll tax rate, then no offset will be implemented ~ will only implement the reform
     else:
         calc = copy.deepcopy(ccalc)
-        dpolicy = copy.deepcopy(cpolicy)
+        dpolicy = TCPPolicy.clone(cpolicy)
         drecs = copy.deepcopy(rrecs)
-        # Check function argument types
-        assert isinstance(calc, tc.Calculator) | isinstance(calc, tcp.Calculator)
-        assert isinstance(reform, dict)
-        assert isinstance(dpolicy, tc.Policy)
-        assert isinstance(drecs, tc.Records)
         CYR = calc.current_year
         dpolicy.implement_reform(reform, print_warnings=False, raise_errors=False)
         calc = tc.Calculator(policy=dpolicy, records=drecs)
         calc.advance_to_year(CYR)
         calc.calc_all()
-        if dump:
-            recs_vinfo = tc.Records(data=None)  # contains records VARINFO only
-            dvars = list(recs_vinfo.USABLE_READ_VARS | recs_vinfo.CALCULATED_VARS)
-            df = calc.dataframe(dvars)
+        return _offset_dataframe(calc, dump)
 
-        else:
-            df = calc.dataframe(tc.DIST_VARIABLES)
-        return df
+
+def employer_payroll_offset_years(reform, ccalc, cpolicy, rrecs, years, dump=False):
+    """
+    Multi-year version of the employer_payroll_offset function, which
+    returns the same dataframe as a call of employer_payroll_offset when
+    ccalc.current_year is each year in years, but copies the policy and
+    records and implements the reform only once, and extrapolates the
+    records only one year at a time.
+
+    Parameters
+    -------
+    reform, ccalc, cpolicy, rrecs, dump:
+        same as in the employer_payroll_offset function
+
+    years: iterable of integers
+        increasing calendar years, none of which precedes the current_year
+        of rrecs, in which the offset is implemented
+
+    Returns
+    -------
+    dfs: dictionary
+        the employer_payroll_offset dataframe of each year, with the year
+        as the dictionary key
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    years = list(years)
+    _check_arguments(reform, ccalc, cpolicy, rrecs)
+    if not years or years[0] < rrecs.current_year:
+        raise ValueError("years must begin no earlier than rrecs.current_year")
+    if any(year2 <= year1 for year1, year2 in zip(years, years[1:])):
+        raise ValueError("years must be strictly increasing")
+    offset = _employer_rates_changed(reform)
+    dpolicy = TCPPolicy.clone(cpolicy)
+    if offset:
+        # make copy of the employer side payroll tax rates before the reform
+        rate1_FICA_mc_trt_employer = dpolicy.to_array(
+            "FICA_mc_trt_employer", year=years
+        )
+        rate1_FICA_ss_trt_employer = dpolicy.to_array(
+            "FICA_ss_trt_employer", year=years
+        )
+    # implement the reform; reform years can precede current_year of dpolicy
+    dpolicy.set_year(dpolicy.start_year)
+    dpolicy.implement_reform(reform, print_warnings=False, raise_errors=False)
+    # the Calculator makes its own copy of the records, which are then
+    # extrapolated from one year to the next instead of from the data year
+    calc = tcp.Calculator(policy=dpolicy, records=rrecs, verbose=False)
+    dfs = dict()
+    for idx, year in enumerate(years):
+        calc.advance_to_year(year)
+        if offset:
+            # the offset is undone after this year's calculation, so it
+            # is not extrapolated to the next year
+            calc.store_records()
+            _apply_offset(
+                calc, rate1_FICA_mc_trt_employer[idx], rate1_FICA_ss_trt_employer[idx]
+            )
+        calc.calc_all()
+        dfs[year] = _offset_dataframe(calc, dump)
+        if offset:
+            calc.restore_records()
+    return dfs
+
+
+def _check_arguments(reform, ccalc, cpolicy, rrecs):
+    """
+    Check the types of the arguments of the employer payroll offset
+    functions.
+    """
+    assert isinstance(ccalc, tc.Calculator) | isinstance(ccalc, tcp.Calculator)
+    assert isinstance(reform, dict)
+    assert isinstance(cpolicy, tc.Policy)
+    assert isinstance(rrecs, tc.Records)
+
+
+def _employer_rates_changed(reform):
+    """
+    Return True if the reform changes the employer side payroll tax rates,
+    which is when the employer payroll offset is implemented.
+    """
+    return bool(
+        reform.get("FICA_ss_trt_employer")
+        or reform.get("FICA_mc_trt_employer") is not None
+    )
+
+
+def _offset_dataframe(calc, dump):
+    """
+    Return the dataframe of the variables of calc returned by the employer
+    payroll offset functions (see the dump argument of
+    employer_payroll_offset).
+    """
+    if dump:
+        recs_vinfo = tc.Records(data=None)  # contains records VARINFO only
+        dvars = list(recs_vinfo.USABLE_READ_VARS | recs_vinfo.CALCULATED_VARS)
+    else:
+        dvars = tc.DIST_VARIABLES
+    return calc.dataframe(dvars)
+
+
+def _apply_offset(calc, rate1_FICA_mc_trt_employer, rate1_FICA_ss_trt_employer):
+    """
+    Replace the wage and pension-contribution variables in the embedded
+    Records object of the reform calc with their values after the offset
+    of the change from the rate1 employer side payroll tax rates to the
+    current_year rates of calc.  See employer_payroll_offset for the
+    offset formulas.
+    """
+    # make copy of the employer side payroll tax rate after the reform
+    rate2_FICA_mc_trt_employer = calc.policy_param("FICA_mc_trt_employer")
+    rate2_FICA_ss_trt_employer = calc.policy_param("FICA_ss_trt_employer")
+
+    # Calculate the employer side payroll tax offset rate
+    offset_rate = (1 + rate1_FICA_mc_trt_employer + rate1_FICA_ss_trt_employer) / (
+        1 + rate2_FICA_mc_trt_employer + rate2_FICA_ss_trt_employer
+    )
+    # wage & income above this maximum of OASDI taxable value will be taxed at this value, instead of the value of wage
+    taxmax = calc.policy_param("SS_Earnings_c")
+
+    # Implement the employer payroll tax offset upon individual taxpayers e00200p, e00200s, pencon_p, pencon_s
+    # e00200 the filling unit will be calculated based upon e00200p and e00200s
+
+    pre_wage_p = calc.array("e00200p")
+    pre_pencon_p = calc.array("pencon_p")
+
+    pre_wp_p = pre_wage_p + pre_pencon_p
+    # assume the ratio of wage to gross wage will remain the same; the `+$1` is to avoid the $0 condition
+    wage_ratio_p = (pre_wage_p + 1) / (pre_wp_p + 1)
+    # check if the taxpaer's gross wage is above or below the maximum OASDI taxable value
+    oasdi_capped_p = pre_wp_p < taxmax
+
+    # Calculate the offset for the taxpayer's gross wage which is above the maximum OASDI taxable value
+    total_comp_above_line_p = (
+        1 + rate1_FICA_mc_trt_employer
+    ) * pre_wp_p + rate1_FICA_ss_trt_employer * taxmax
+    new_wp_above_line_p = (
+        total_comp_above_line_p - rate2_FICA_ss_trt_employer * taxmax
+    ) / (1 + rate2_FICA_mc_trt_employer)
+    new_wage_above_line_p = wage_ratio_p * new_wp_above_line_p
+    new_pencon_above_line_p = (1 - wage_ratio_p) * new_wp_above_line_p
+
+    # Calculate the offset for the taxpayer's wage & income which is below the maximum OASDI taxable value
+    new_wage_below_line_p = pre_wage_p * offset_rate
+    new_wage_p = np.where(
+        oasdi_capped_p, new_wage_below_line_p, new_wage_above_line_p
+    )
+
+    # Calculate the offset for the taxpayer's pencon which is below the maximum OASDI taxable value
+    new_pencon_below_line_p = pre_pencon_p * offset_rate
+    new_pencon_p = np.where(
+        oasdi_capped_p, new_pencon_below_line_p, new_pencon_above_line_p
+    )
+
+    calc.zeroarray("e00200p")
+    calc.incarray("e00200p", new_wage_p)
+
+    calc.zeroarray("pencon_p")
+    calc.incarray("pencon_p", new_pencon_p)
+
+    pre_wage_s = calc.array("e00200s")
+    pre_pencon_s = calc.array("pencon_s")
+
+    pre_wp_s = pre_wage_s + pre_pencon_s
+    # assume the ratio of wage to gross wage will remain the same; the `+$1` is to avoid the $0 condition
+    wage_ratio_s = (pre_wage_s + 1) / (pre_wp_s + 1)
+    # check if the taxpaer's gross wage is above or below the maximum OASDI taxable value
+    oasdi_capped_s = pre_wp_s < taxmax
+
+    # Calculate the offset for the taxpayer's gross wage which is above the maximum OASDI taxable value
+    total_comp_above_line_s = (
+        1 + rate1_FICA_mc_trt_employer
+    ) * pre_wp_s + rate1_FICA_ss_trt_employer * taxmax
+    new_wp_above_line_s = (
+        total_comp_above_line_s - rate2_FICA_ss_trt_employer * taxmax
+    ) / (1 + rate2_FICA_mc_trt_employer)
+    new_wage_above_line_s = wage_ratio_s * new_wp_above_line_s
+    new_pencon_above_line_s = (1 - wage_ratio_s) * new_wp_above_line_s
+
+    # Calculate the offset for the taxpayer's wage & income which is below the maximum OASDI taxable value
+    new_wage_below_line_s = pre_wage_s * offset_rate
+    new_wage_s = np.where(
+        oasdi_capped_s, new_wage_below_line_s, new_wage_above_line_s
+    )
+
+    # Calculate the offset for the taxpayer's pencon which is below the maximum OASDI taxable value
+    new_pencon_below_line_s = pre_pencon_s * offset_rate
+    new_pencon_s = np.where(
+        oasdi_capped_s, new_pencon_below_line_s, new_pencon_above_line_s
+    )
+
+    calc.zeroarray("e00200s")
+    calc.incarray("e00200s", new_wage_s)
+
+    calc.zeroarray("pencon_s")
+    calc.incarray("pencon_s", new_pencon_s)
+
+    # note: e00200 is calculated through e00200 = e00200p + e00200s, instead of multiplying the offset rate which may cause this equation not held because of the decimial issues
+    new_wage = new_wage_s + new_wage_p
+    calc.zeroarray("e00200")
+    calc.incarray("e00200", new_wage)
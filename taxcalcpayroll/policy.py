@@ -6,16 +6,49 @@ Taxcalc-Payroll federal tax policy Policy class.
 # pycodestyle policy.py
 # pylint --disable=locally-disabled policy.py
 
+import os
+import sys
+import copy
+import pickle
+import hashlib
+import tempfile
+import importlib.metadata
+import numpy as np
+import paramtools
+from paramtools.parameters import ParameterSlice
+from paramtools.schema_factory import SchemaFactory
+import taxcalc
+from taxcalc.growfactors import GrowFactors
 from taxcalc.policy import Policy as TCPol
 
 
+# Name of the environment variable that turns on the on-disk caching of
+# the current-law policy parameters.  Its value is the cache directory.
+POLICY_CACHE_ENV = "TCPPOLICYCACHE"
+
+
 class Policy(TCPol):
     """
     Policy is a subclass of the Tax-Calculator's Policy class,
     In fact, Taxcalc-Payroll's Policy class is excatly the same as
-    the Tax-Calculator's Policy class.
+    the Tax-Calculator's Policy class, except that it can cache the
+    current-law policy parameters on disk and has a cheap clone method.
     Therefore, inherits its methods (none of which are shown here).
 
+    When the TCPPOLICYCACHE environment variable is set to a directory
+    name, the first Policy() construction saves the fully expanded
+    (that is, year-indexed) current-law parameter values in that
+    directory, and later Policy() constructions (in any process) load
+    them from there instead of expanding the parameter values for every
+    year, so only the first construction in a process parses and
+    validates the defaults JSON file.  The cache file name contains a
+    hash of the contents of the defaults JSON file and of the
+    growfactors file (and of the Python, taxcalc, paramtools, numpy and
+    marshmallow versions), so changing any of them makes a new cache
+    file.  The gfactors argument can be specified, in which case the
+    hash is of the gfactors growth factors, but constructions with other
+    arguments do not use the cache.
+
     Constructor for the federal tax policy class.
 
     Returns
@@ -23,4 +56,184 @@ class Policy(TCPol):
     class instance: Policy
     """
 
-    pass
+    # Parameters attributes that are rebuilt rather than cached because
+    # they contain classes made at run time, which cannot be pickled
+    SCHEMA_ATTRS = [
+        "_defaults_schema",
+        "_validator_schema",
+        "label_validators",
+        "keyfuncs",
+        "sel",
+    ]
+
+    # Parameters attributes that are never changed after construction
+    # and so are shared (rather than copied) by the clone method
+    CLONE_SHARED_ATTRS = [
+        "_defaults_schema",
+        "label_validators",
+        "keyfuncs",
+        "defaults",
+        "_gfactors",
+        "_removed_params",
+        "_redefined_params",
+        "_wage_indexed",
+    ]
+
+    def __init__(self, gfactors=None, only_reading_defaults=False, **kwargs):
+        cache_dir = os.environ.get(POLICY_CACHE_ENV, "")
+        if (
+            not cache_dir
+            or not (gfactors is None or isinstance(gfactors, GrowFactors))
+            or only_reading_defaults
+            or kwargs
+        ):
+            super().__init__(gfactors, only_reading_defaults, **kwargs)
+            return
+        cache_key = Policy.cache_key(gfactors)
+        cache_path = os.path.join(cache_dir, "policy-{}.pkl".format(cache_key))
+        if os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "rb") as cfile:
+                    state = pickle.load(cfile)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                state = None  # so, ignore an unreadable cache file
+            if isinstance(state, dict):
+                self._load_state(state, cache_key)
+                return
+        super().__init__(gfactors)
+        state = {
+            name: value
+            for name, value in vars(self).items()
+            if name not in Policy.SCHEMA_ATTRS
+        }
+        # write to a temporary file first, so that other processes never
+        # read an incomplete cache file
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as cfile:
+            pickle.dump(state, cfile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cfile.name, cache_path)
+
+    @staticmethod
+    def cache_key(gfactors=None):
+        """
+        Return hash of the contents of the defaults JSON file and of the
+        growth factors (the growfactors file when gfactors is None), and
+        of the other things that determine the current-law policy
+        parameter values or whether the cached values can be unpickled.
+        """
+        hasher = hashlib.sha256()
+        filepath = os.path.join(Policy.DEFAULTS_FILE_PATH, Policy.DEFAULTS_FILE_NAME)
+        with open(filepath, "rb") as pfile:
+            hasher.update(pfile.read())
+        if gfactors is None:
+            filepath = os.path.join(GrowFactors.FILE_PATH, GrowFactors.FILE_NAME)
+            with open(filepath, "rb") as gfile:
+                hasher.update(gfile.read())
+        else:
+            hasher.update(repr(list(gfactors.gfdf.columns)).encode("utf-8"))
+            hasher.update(gfactors.gfdf.index.values.tobytes())
+            hasher.update(gfactors.gfdf.values.astype(np.float64).tobytes())
+        things = [
+            sys.version,
+            taxcalc.__version__,
+            paramtools.__version__,
+            np.__version__,
+            importlib.metadata.version("marshmallow"),
+            Policy.JSON_START_YEAR,
+            Policy.LAST_KNOWN_YEAR,
+            Policy.LAST_BUDGET_YEAR,
+        ]
+        hasher.update(repr(things).encode("utf-8"))
+        return hasher.hexdigest()[:32]
+
+    def clone(self):
+        """
+        Return a copy of this Policy object that can be changed (for
+        example, by implement_reform or set_year) without changing this
+        Policy object, like copy.deepcopy(self) but much faster.
+
+        The copy shares the immutable schema and defaults attributes and
+        copies only the parameter values and the other state that can be
+        changed.  This method can also be called as Policy.clone(policy)
+        with policy being any taxcalc Policy object.
+        """
+        clone = object.__new__(type(self))
+        for name, value in vars(self).items():
+            if name in Policy.CLONE_SHARED_ATTRS:
+                setattr(clone, name, value)
+            elif name in ("_validator_schema", "sel"):
+                continue  # because these refer to the Policy object
+            elif name == "_data":
+                clone._data = _copy_data(value)
+            else:
+                setattr(clone, name, copy.deepcopy(value))
+        clone._validator_schema = type(self._validator_schema)()
+        clone._validator_schema.context["spec"] = clone
+        clone.sel = ParameterSlice(clone)
+        return clone
+
+    def __deepcopy__(self, memo):
+        """
+        Return clone of this Policy object, so that copy.deepcopy (which
+        is how the Tax-Calculator Calculator constructor copies its policy
+        argument) is as cheap as the clone method.
+        """
+        clone = self.clone()
+        memo[id(self)] = clone
+        return clone
+
+    def _load_state(self, state, cache_key):
+        """
+        Set Policy object to the cached state, rebuilding the schema
+        attributes from the schema classes made once in a process for
+        each cache key (see _schema_classes).
+        """
+        self.__dict__.update(state)
+        if cache_key not in _SCHEMA_CLASSES:
+            _SCHEMA_CLASSES[cache_key] = _schema_classes(self.defaults)
+        factory, defaults_schema_class, validator_schema_class = _SCHEMA_CLASSES[
+            cache_key
+        ]
+        self._defaults_schema = defaults_schema_class()
+        self._validator_schema = validator_schema_class()
+        self._validator_schema.context["spec"] = self
+        self.label_validators = factory.label_validators
+        self.keyfuncs = dict()
+        for label, validator in self.label_validators.items():
+            cmp_funcs = getattr(validator, "cmp_funcs", None)
+            if cmp_funcs is not None:
+                self.keyfuncs[label] = cmp_funcs()["key"]
+        self.sel = ParameterSlice(self)
+
+
+def _copy_data(data):
+    """
+    Return copy of the Policy _data dictionary in which the parameter
+    dictionaries and their value objects (which contain scalar values)
+    are copied and the other parameter metadata are shared.
+    """
+    copied = data.__class__()
+    for name, param in data.items():
+        param = dict(param)
+        param["value"] = [dict(vo) for vo in param["value"]]
+        copied[name] = param
+    return copied
+
+
+# schema classes made by _schema_classes function for each cache key
+_SCHEMA_CLASSES = dict()
+
+
+def _schema_classes(defaults):
+    """
+    Return (factory, DefaultsSchema, ValidatorSchema) tuple containing the
+    SchemaFactory object for the defaults JSON file and the classes of the
+    schemas made by its schemas() method, which is how paramtools makes
+    them for a new Policy object.  The schemas() method also loads (that
+    is, deserializes and validates) the defaults, but this is done only
+    once in a process for each cache key, rather than for each Policy
+    object.
+    """
+    factory = SchemaFactory(defaults)
+    defaults_schema, validator_schema, _, _ = factory.schemas()
+    return (factory, type(defaults_schema), type(validator_schema))
@@ -6,15 +6,46 @@ Taxcalc-Payroll tax-filing-unit Records class.
 # pycodestyle records.py
 # pylint --disable=locally-disabled records.py
 
+import os
+import numpy as np
+import pandas as pd
 from taxcalc.records import Records as TCRec
+from taxcalcpayroll.calcgraph import required_read_variables
 
 
 class Records(TCRec):
     """
     Records is a subclass of Tax-Calculator's Records class.
-    In fact, Taxcalc-Payroll's Records class is excatly the same as
-    the Tax-Calculator's Records class.
-    Therefore, inherits its methods (none of which are shown here).
+    Taxcalc-Payroll's Records class is the same as the Tax-Calculator's
+    Records class, except that the data argument can also be the path of
+    a directory of memory-mapped .npy column files (written by the
+    write_npy_dir method), so it inherits all the other methods (none of
+    which are shown here).
+
+    When data is such a directory, each input variable is a read-only
+    NumPy memmap of its .npy file, so several processes on one host that
+    construct Records objects from the same directory share one physical
+    copy of the input data, and Calculator objects share (rather than
+    copy) those read-only arrays.  The calculated variables (and any
+    input variable without a .npy file) are allocated lazily, as arrays
+    of zeros, when first used.  An input variable that is changed in
+    place, by the data extrapolation done when aging the data to a later
+    year, is first replaced with an in-memory copy.
+
+    When the output_vars keyword argument is a list of Records variable
+    names, only the input variables needed to calculate those output
+    variables are read, stored and aged (see the calcgraph.py module),
+    so Records objects used, for example, only to calculate payroll
+    taxes read just a dozen input variables.  The other input variables
+    are all zeros, so only the output_vars (and the variables they
+    depend on) have correct values after calculations.
+
+    When the compact keyword argument is True, integer input variables
+    (such as MARS, XTOT, EIC, n24 and the ages) are stored as int8 or
+    int16 arrays and float input variables (dollar amounts) are stored
+    as float32 arrays where that changes no value by more than half a
+    cent, which roughly halves the memory used by the input variables.
+    The compact_precision_report function shows the effect on results.
 
     Constructor for the tax-filing-unit Records class.
 
@@ -46,4 +77,338 @@ class Records(TCRec):
     # suppress pylint warnings about too many class instance attributes:
     # pylint: disable=too-many-instance-attributes
 
-    pass
+    # groups of input variables whose values are checked for consistency
+    # by the constructor, so that a group is read whenever one of its
+    # variables is read
+    CONSISTENT_READ_VARS = [
+        {"e00200", "e00200p", "e00200s"},
+        {"e00900", "e00900p", "e00900s"},
+        {"e02100", "e02100p", "e02100s"},
+        {"e00600", "e00650"},
+        {"e01500", "e01700"},
+    ]
+
+    # integer input variables that are never stored in compact form
+    NONCOMPACT_INTEGER_VARS = {"RECID", "FLPDYR", "h_seq", "fips", "a_lineno"}
+
+    # largest change in a dollar amount allowed when stored as float32
+    COMPACT_FLOAT_TOLERANCE = 0.005
+
+    def __init__(self, *args, output_vars=None, compact=False, **kwargs):
+        if output_vars is None:
+            self._read_vars = None
+        else:
+            self._read_vars = required_read_variables(output_vars)
+        self._compact = bool(compact)
+        super().__init__(*args, **kwargs)
+
+    def __getattr__(self, name):
+        """
+        Allocate lazily a variable of a Records object whose data are
+        read from a directory of .npy column files or whose input
+        variables are projected on output_vars.
+        """
+        # only called when name is not an instance attribute
+        lazy_vars = self.__dict__.get("_lazy_vars", ())
+        if name not in lazy_vars:
+            raise AttributeError(
+                "'{}' object has no attribute '{}'".format(type(self).__name__, name)
+            )
+        if name in self.INTEGER_VARS:
+            value = np.zeros(self.array_length, dtype=np.int32)
+        else:
+            value = np.zeros(self.array_length, dtype=np.float64)
+        setattr(self, name, value)
+        return value
+
+    def increment_year(self):
+        """
+        Add one to current year, and also does
+        extrapolation, reweighting, adjusting for new current year,
+        after replacing each read-only (that is, memory-mapped) input
+        variable that can be changed in place with an in-memory copy.
+        """
+        aging = self.gfactors is not None or self.ADJ.size > 0
+        if aging:
+            for varname in self.USABLE_READ_VARS - self.INTEGER_READ_VARS:
+                value = self.__dict__.get(varname)
+                if isinstance(value, np.ndarray) and not value.flags.writeable:
+                    setattr(self, varname, np.array(value))
+        lazy_vars = self.__dict__.get("_lazy_vars")
+        if not lazy_vars:
+            super().increment_year()
+            return
+        # age only the variables that have been allocated, because an
+        # unallocated variable is all zeros in every year, so during the
+        # aging all the unallocated input variables share one zero array
+        unallocated = set(
+            varname
+            for varname in lazy_vars & self.USABLE_READ_VARS
+            if varname not in self.__dict__
+        )
+        scratch = np.zeros(self.array_length, dtype=np.float64)
+        for varname in unallocated:
+            setattr(self, varname, scratch)
+        try:
+            super().increment_year()
+        finally:
+            for varname in unallocated:
+                delattr(self, varname)
+        assert not scratch.any()
+
+    @staticmethod
+    def write_npy_dir(data, dirpath):
+        """
+        Write each input variable in data to a .npy column file in the
+        dirpath directory, which is created if it does not exist, so
+        that dirpath can be used as the data argument of the Records
+        class constructor.  The data argument is a Pandas DataFrame or
+        the path of a CSV file; data columns that are not usable input
+        variables are ignored, and integer (float) variables are written
+        as int32 (float64) arrays, which are the Records array types.
+        Returns list of names of the variables written to dirpath.
+        """
+        if isinstance(data, str):
+            data = pd.read_csv(data)
+        if not isinstance(data, pd.DataFrame):
+            raise ValueError("data is neither a string nor a Pandas DataFrame")
+        varinfo = Records(data=None)
+        os.makedirs(dirpath, exist_ok=True)
+        written = list()
+        for varname in data.columns:
+            if varname not in varinfo.USABLE_READ_VARS:
+                continue
+            if varname in varinfo.INTEGER_READ_VARS:
+                dtype = np.int32
+            else:
+                dtype = np.float64
+            values = np.ascontiguousarray(data[varname].values, dtype=dtype)
+            np.save(os.path.join(dirpath, varname + ".npy"), values)
+            written.append(varname)
+        return written
+
+    def _read_data(self, data):
+        """
+        Read data from directory of .npy column files, or read only the
+        input variables needed to calculate the output_vars, or else read
+        data as in the Tax-Calculator's Records class.
+        """
+        if isinstance(data, str) and os.path.isdir(data):
+            read_vars, index = self._npy_dir_columns(data)
+        elif self._read_vars is not None and (
+            isinstance(data, pd.DataFrame)
+            or (isinstance(data, str) and os.path.isfile(data))
+        ):
+            read_vars, index = self._frame_columns(data)
+        else:
+            super()._read_data(data)
+            if self._compact and data is not None:
+                self._compact_read_vars()
+            return
+        if not self.MUST_READ_VARS.issubset(read_vars):
+            raise ValueError("data missing one or more MUST_READ_VARS")
+        # the Tax-Calculator Data._read_data method sets the number of
+        # records and their index from a DataFrame with just the
+        # MUST_READ_VARS; the zero arrays (which np.zeros allocates
+        # without using memory until they are changed) that it sets for
+        # the other variables are removed, so they are allocated lazily
+        ignored_vars = self.IGNORED_VARS
+        super()._read_data(
+            pd.DataFrame(
+                {varname: read_vars[varname] for varname in self.MUST_READ_VARS},
+                index=index,
+            )
+        )
+        self.IGNORED_VARS = ignored_vars
+        self._lazy_vars = (self.CALCULATED_VARS | self.USABLE_READ_VARS) - set(
+            read_vars
+        )
+        for varname in self._lazy_vars:
+            delattr(self, varname)
+        for varname, values in read_vars.items():
+            setattr(self, varname, values)
+        if self._compact:
+            self._compact_read_vars()
+
+    def _compact_read_vars(self):
+        """
+        Store each stored input variable whose values allow it as an
+        int8 or int16 (integer variables) or float32 (float variables)
+        array.  A float variable is stored as float32 only when no value
+        changes by more than COMPACT_FLOAT_TOLERANCE.
+        """
+        compactible = self.USABLE_READ_VARS - Records.NONCOMPACT_INTEGER_VARS
+        for varname in sorted(compactible & set(self.__dict__)):
+            value = self.__dict__[varname]
+            if not isinstance(value, np.ndarray) or value.size == 0:
+                continue
+            if varname in self.INTEGER_READ_VARS:
+                for dtype in (np.int8, np.int16):
+                    info = np.iinfo(dtype)
+                    if info.min <= value.min() and value.max() <= info.max:
+                        setattr(self, varname, value.astype(dtype))
+                        break
+            else:
+                compact = value.astype(np.float32)
+                error = np.abs(compact - value).max()
+                if error <= Records.COMPACT_FLOAT_TOLERANCE:
+                    setattr(self, varname, compact)
+
+    def _projected_read_vars(self):
+        """
+        Return set of names of the input variables to read, which is None
+        when all the input variables are read.
+        """
+        if self._read_vars is None:
+            return None
+        read_vars = set(self._read_vars) | self.MUST_READ_VARS | {"s006"}
+        for group in Records.CONSISTENT_READ_VARS:
+            if read_vars & group:
+                read_vars |= group
+        return read_vars
+
+    def _npy_dir_columns(self, dirpath):
+        """
+        Return tuple containing dictionary of read-only memory-mapped
+        input variables in the dirpath directory of .npy column files
+        and the index of the records.
+        """
+        projected = self._projected_read_vars()
+        read_vars = dict()
+        self.IGNORED_VARS = set()
+        for fname in sorted(os.listdir(dirpath)):
+            varname, ext = os.path.splitext(fname)
+            if ext != ".npy":
+                continue
+            # FLPDYR is always set in place to the data year
+            if (
+                varname not in self.USABLE_READ_VARS
+                or varname == "FLPDYR"
+                or (projected is not None and varname not in projected)
+            ):
+                self.IGNORED_VARS.add(varname)
+                continue
+            values = np.load(os.path.join(dirpath, fname), mmap_mode="r")
+            if varname in self.INTEGER_READ_VARS:
+                dtype = np.int32
+            else:
+                dtype = np.float64
+            if values.ndim != 1:
+                msg = "{} is not a one-dimensional array"
+                raise ValueError(msg.format(fname))
+            if values.dtype != dtype:
+                # converting to the Records array type makes an in-memory copy
+                values = values.astype(dtype)
+            read_vars[varname] = values
+        sizes = set(len(values) for values in read_vars.values())
+        if len(sizes) > 1:
+            raise ValueError("data .npy files do not have the same length")
+        return (read_vars, pd.RangeIndex(sizes.pop() if sizes else 0))
+
+    def _frame_columns(self, data):
+        """
+        Return tuple containing dictionary of the projected input
+        variables in data, which is a Pandas DataFrame or the path of a
+        CSV file, and the index of data.
+        """
+        projected = self._projected_read_vars()
+        if isinstance(data, str):
+            columns = pd.read_csv(data, nrows=0).columns
+            data = pd.read_csv(data, usecols=lambda name: name in projected)
+        else:
+            columns = data.columns
+        self.IGNORED_VARS = set(
+            varname
+            for varname in columns
+            if varname not in self.USABLE_READ_VARS or varname not in projected
+        )
+        read_vars = dict()
+        for varname in data.columns:
+            if varname in self.IGNORED_VARS:
+                continue
+            if varname in self.INTEGER_READ_VARS:
+                read_vars[varname] = data[varname].astype(np.int32).values
+            else:
+                read_vars[varname] = data[varname].astype(np.float64).values
+        return (read_vars, data.index)
+
+
+def compact_precision_report(
+    policy, num_years=1, variables=("payrolltax", "iitax"), **records_kwargs
+):
+    """
+    Compare the results of calculations using compact Records (that is,
+    Records constructed with compact=True) with the results using the
+    usual float64 Records.
+
+    Parameters
+    ----------
+    policy: Policy class object
+        the policy used in both sets of calculations
+
+    num_years: integer
+        number of years, beginning with the current_year of Calculator
+        objects constructed from policy and the Records objects, in which
+        calc_all() results are compared
+
+    variables: list or tuple of Records variable names
+        the calculated variables whose results are compared
+
+    records_kwargs: keyword arguments
+        the arguments of the Records class constructor, other than
+        compact, used to construct both Records objects
+
+    Returns
+    -------
+    Pandas DataFrame containing one row for each year and variable, with
+    the weighted (by s006) totals of the variable using float64 and
+    compact Records, their difference and relative difference, and the
+    largest absolute difference for any filing unit.
+    """
+    # pylint: disable=import-outside-toplevel
+    from taxcalcpayroll.calculator import Calculator
+
+    if num_years < 1:
+        raise ValueError("num_years must be at least one")
+    calcs = [
+        Calculator(
+            policy=policy,
+            records=Records(compact=compact, **records_kwargs),
+        )
+        for compact in (False, True)
+    ]
+    rows = list()
+    for iyr in range(num_years):
+        if iyr > 0:
+            for calc in calcs:
+                calc.increment_year()
+        for calc in calcs:
+            calc.calc_all()
+        weights = calcs[0].array("s006")
+        for var in variables:
+            exact = calcs[0].array(var)
+            compact = calcs[1].array(var)
+            exact_total = (exact * weights).sum()
+            compact_total = (compact * weights).sum()
+            diff = compact_total - exact_total
+            rows.append(
+                [
+                    calcs[0].current_year,
+                    var,
+                    exact_total,
+                    compact_total,
+                    diff,
+                    diff / exact_total if exact_total != 0.0 else 0.0,
+                    np.abs(compact - exact).max(),
+                ]
+            )
+    columns = [
+        "year",
+        "variable",
+        "float64_total",
+        "compact_total",
+        "difference",
+        "relative_difference",
+        "max_unit_difference",
+    ]
+    return pd.DataFrame(data=rows, columns=columns)
@@ -0,0 +1,256 @@
+"""
+Taxcalc-Payroll parameter-grid sweep of payroll tax revenue.
+"""
+
+# CODING-STYLE CHECKS:
+# pycodestyle sweep.py
+# pylint --disable=locally-disabled sweep.py
+
+import itertools
+import collections
+import numpy as np
+import pandas as pd
+
+
+SWEEP_PARAMETERS = [
+    "FICA_ss_trt_employer",
+    "FICA_ss_trt_employee",
+    "FICA_mc_trt_employer",
+    "FICA_mc_trt_employee",
+    "SS_Earnings_c",
+    "SS_Earnings_thd",
+    "AMEDT_rt",
+]
+
+
+def payroll_sweep(calc, grid, arrays=False, cache_size=8):
+    """
+    Compute aggregate weighted payroll tax revenue, the sum over filing
+    units of payrolltax * s006, at every point of a Cartesian grid of
+    policy parameter values.  The payrolltax values are the same as those
+    computed by the EI_PayrollTax and AdditionalMedicareTax functions
+    when the grid-point parameter values are the current_year values of
+    the calc object's Policy, which is left unchanged by this function.
+
+    The payroll tax formulas are piecewise linear in the grid parameters,
+    so the earnings components of those formulas depend on only some of
+    the parameters: taxable (that is, capped) wages depend only on
+    SS_Earnings_c; uncapped self-employment earnings only on the four
+    FICA rates; taxable self-employment earnings only on the four FICA
+    rates and SS_Earnings_c; earnings above SS_Earnings_thd only on
+    SS_Earnings_thd and the two FICA_ss_trt rates; and the earnings
+    subject to the Additional Medicare Tax only on the four FICA rates.
+    Each component is computed for a set of values of the parameters it
+    depends on and is reused at the grid points that have those values,
+    so each grid point costs just a few array operations.  The grid
+    points are visited in an order in which points having the same four
+    FICA rates, and then the same SS_Earnings_c value, are adjacent, and
+    only the cache_size most recently used values of each kind of
+    component are kept, so the memory used does not grow with the number
+    of grid points.
+
+    Parameters
+    ----------
+    calc: Calculator object
+        the Records input variables and all policy parameter values not
+        in the grid are taken from calc, whose current_year is the year
+        of the sweep
+
+    grid: dictionary
+        keys are parameter names in the SWEEP_PARAMETERS list and each
+        value is a list of current_year values of that parameter
+
+    arrays: boolean
+        specifies whether or not to also return the payrolltax value of
+        every filing unit at every grid point
+
+    cache_size: integer
+        maximum number of values of each of the five kinds of earnings
+        components that are kept, each of which contains one or two
+        arrays of filing-unit values; a component that is dropped is
+        computed again when needed, so cache_size affects only speed and
+        memory use, and a cache_size not smaller than the number of grid
+        values of SS_Earnings_thd is enough to compute each component at
+        most once for each set of values of the four FICA rates
+
+    Returns
+    -------
+    Pandas DataFrame containing one row for each grid point, with one
+    column for each grid parameter and a payrolltax column containing
+    the aggregate weighted payroll tax revenue at that grid point.
+    If arrays is True, a tuple is returned containing that DataFrame
+    and a numpy array containing the payrolltax value of each filing
+    unit, which has one row for each grid point (in the same order as
+    the DataFrame rows) and one column for each filing unit.
+    """
+    # pylint: disable=too-many-locals
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError("grid must be a non-empty dictionary")
+    for pname, pvalues in grid.items():
+        if pname not in SWEEP_PARAMETERS:
+            msg = 'payroll_sweep grid parameter "{}" is not valid'
+            raise ValueError(msg.format(pname))
+        if not isinstance(pvalues, list) or not pvalues:
+            msg = 'payroll_sweep grid values of "{}" must be a non-empty list'
+            raise ValueError(msg.format(pname))
+    if not isinstance(cache_size, int) or cache_size < 1:
+        raise ValueError("cache_size must be a positive integer")
+    components = _PayrollComponents(calc, cache_size)
+    weights = calc.array("s006")
+    base = {pname: float(calc.policy_param(pname)) for pname in SWEEP_PARAMETERS}
+    points = list(itertools.product(*grid.values()))
+    revenue = np.zeros(len(points))
+    if arrays:
+        payrolltax_arrays = np.zeros((len(points), calc.array_len))
+    params_list = list()
+    for point in points:
+        params = dict(base)
+        params.update(zip(grid.keys(), (float(val) for val in point)))
+        params_list.append(params)
+    # visit points sharing components one after another (see docstring)
+    order = sorted(
+        range(len(points)),
+        key=lambda idx: [params_list[idx][pname] for pname in SWEEP_PARAMETERS],
+    )
+    for idx in order:
+        payrolltax = components.payrolltax(params_list[idx])
+        revenue[idx] = (payrolltax * weights).sum()
+        if arrays:
+            payrolltax_arrays[idx] = payrolltax
+    sweep = pd.DataFrame(data=points, columns=list(grid.keys()))
+    sweep["payrolltax"] = revenue
+    if arrays:
+        return (sweep, payrolltax_arrays)
+    return sweep
+
+
+class _PayrollComponents:
+    """
+    Cache of the earnings components of the payroll tax formulas, each
+    of which is computed once for each distinct set of values of the
+    policy parameters it depends on while it is among the cache_size
+    most recently used values of its kind.  The arithmetic follows
+    exactly the same steps as the EI_PayrollTax and AdditionalMedicareTax
+    functions.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, calc, cache_size):
+        self.seca_thd = calc.policy_param("SECA_Earnings_thd")
+        e00200p = calc.array("e00200p")
+        e00200s = calc.array("e00200s")
+        e00200 = calc.array("e00200")
+        self.sey_p = (
+            calc.array("e00900p") + calc.array("e02100p") + calc.array("k1bx14p")
+        )
+        self.sey_s = (
+            calc.array("e00900s") + calc.array("e02100s") + calc.array("k1bx14s")
+        )
+        self.sey = self.sey_p + self.sey_s
+        self.gross_was_p = e00200p + calc.array("pencon_p")
+        self.gross_was_s = e00200s + calc.array("pencon_s")
+        amedt_ec = np.take(calc.policy_param("AMEDT_ec"), calc.array("MARS") - 1)
+        self.amc_was = np.maximum(0.0, e00200 - amedt_ec)
+        self.amc_line11 = np.maximum(0.0, amedt_ec - e00200)
+        self.pos_sey = np.maximum(0.0, self.sey)
+        self.cache_size = cache_size
+        self.cache = collections.defaultdict(collections.OrderedDict)
+
+    def _cached(self, key, func):
+        """
+        Return cached value of component identified by key, whose first
+        element is the kind of component, calling func to compute the
+        component when it is not in the cache and then dropping the
+        least recently used value of that kind when there are more than
+        cache_size of them.
+        """
+        cache = self.cache[key[0]]
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        value = func()
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def payrolltax(self, params):
+        """
+        Return array of payrolltax values for the params dictionary of
+        parameter values, which contains all the SWEEP_PARAMETERS.
+        """
+        # pylint: disable=too-many-locals
+        ss_er = params["FICA_ss_trt_employer"]
+        ss_ee = params["FICA_ss_trt_employee"]
+        mc_er = params["FICA_mc_trt_employer"]
+        mc_ee = params["FICA_mc_trt_employee"]
+        cap = params["SS_Earnings_c"]
+        thd = params["SS_Earnings_thd"]
+        rates = (ss_er, ss_ee, mc_er, mc_ee)
+        ss_rate = ss_er + ss_ee
+        mc_rate = mc_er + mc_ee
+        # capped (taxable) wage-and-salary earnings
+        txearn_was_p, txearn_was_s = self._cached(
+            ("was", cap),
+            lambda: (
+                np.minimum(cap, self.gross_was_p),
+                np.minimum(cap, self.gross_was_s),
+            ),
+        )
+        ptax_was = (
+            ss_rate * txearn_was_p
+            + ss_rate * txearn_was_s
+            + mc_rate * self.gross_was_p
+            + mc_rate * self.gross_was_s
+        )
+        # uncapped and capped (taxable) self-employment earnings
+        sey_frac = 1.0 - 0.5 * (ss_er + ss_ee + mc_er + mc_ee)
+        uncapped_sey_p, uncapped_sey_s, seca_taxed = self._cached(
+            ("sey", rates),
+            lambda: (
+                np.maximum(0.0, self.sey_p * sey_frac),
+                np.maximum(0.0, self.sey_s * sey_frac),
+                self.sey * sey_frac > self.seca_thd,
+            ),
+        )
+        txearn_sey_p, txearn_sey_s = self._cached(
+            ("txsey", rates, cap),
+            lambda: (
+                np.minimum(uncapped_sey_p, cap - txearn_was_p),
+                np.minimum(uncapped_sey_s, cap - txearn_was_s),
+            ),
+        )
+        setax_p = ss_rate * txearn_sey_p + mc_rate * uncapped_sey_p
+        setax_s = ss_rate * txearn_sey_s + mc_rate * uncapped_sey_s
+        setax = np.where(seca_taxed, setax_p + setax_s, 0.0)
+        # earnings above SS_Earnings_thd
+        extra_ss_income_p, extra_ss_income_s = self._cached(
+            ("extra", ss_er, ss_ee, thd),
+            lambda: self._extra_ss_income(ss_er, ss_ee, thd),
+        )
+        extra_payrolltax = extra_ss_income_p * ss_rate + extra_ss_income_s * ss_rate
+        payrolltax = ptax_was + setax + extra_payrolltax
+        # earnings subject to Additional Medicare Tax
+        amc_earnings = self._cached(("amc", rates), lambda: self._amc_earnings(rates))
+        return payrolltax + params["AMEDT_rt"] * amc_earnings
+
+    def _extra_ss_income(self, ss_er, ss_ee, thd):
+        """
+        Return earnings above SS_Earnings_thd for taxpayer and spouse.
+        """
+        sey_frac = 1.0 - 0.5 * (ss_er + ss_ee)
+        was_plus_sey_p = self.gross_was_p + np.maximum(0.0, self.sey_p * sey_frac)
+        was_plus_sey_s = self.gross_was_s + np.maximum(0.0, self.sey_s * sey_frac)
+        return (
+            np.maximum(0.0, was_plus_sey_p - thd),
+            np.maximum(0.0, was_plus_sey_s - thd),
+        )
+
+    def _amc_earnings(self, rates):
+        """
+        Return earnings subject to the Additional Medicare Tax.
+        """
+        ss_er, ss_ee, mc_er, mc_ee = rates
+        line8 = self.pos_sey * (1.0 - 0.5 * (mc_er + mc_ee + ss_er + ss_ee))
+        return self.amc_was + np.maximum(0.0, line8 - self.amc_line11)
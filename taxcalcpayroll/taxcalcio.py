@@ -6,7 +6,37 @@ Tax-Calculator Input-Output class.
 # pycodestyle taxcalcio.py
 # pylint --disable=locally-disabled taxcalcio.py
 
+import os
+import gc
+import contextlib
+import sqlite3
+import zipfile
+import itertools
+import numpy as np
+import pandas as pd
 from taxcalc.taxcalcio import TaxCalcIO as tcio
+from taxcalc.calculator import Calculator as TCCalculator
+from taxcalc.consumption import Consumption
+from taxcalc.records import Records
+from taxcalc.growdiff import GrowDiff
+from taxcalc.growfactors import GrowFactors
+from taxcalcpayroll.policy import Policy as TCPPolicy
+
+
+# Dump OUTPUT file formats and the compression codecs allowed for each,
+# with the first codec being the default; CSV output is not compressed.
+OUTPUT_FORMATS = {
+    "csv": [],
+    "parquet": ["snappy", "zstd", "gzip", "brotli", "lz4", "none"],
+    "feather": ["lz4", "zstd", "none"],
+}
+
+# Number of rows inserted by each executemany call of a SQLiteDumpWriter.
+SQLDB_BATCH_SIZE = 10000
+
+# Extensions of INPUT file names, other than .csv, that can be read by
+# TaxCalcIO; Parquet and Feather files require the pyarrow package.
+COLUMNAR_INPUT_EXTENSIONS = (".parquet", ".feather", ".npz")
 
 
 class TaxCalcIO(tcio):
@@ -18,8 +48,9 @@ class TaxCalcIO(tcio):
     Parameters
     ----------
     input_data: string or Pandas DataFrame
-        string is name of INPUT file that is CSV formatted containing
-        variable names in the Records USABLE_READ_VARS set, or
+        string is name of INPUT file that is CSV formatted, or that is a
+        Parquet, Feather or NumPy .npz file (see read_input_file),
+        containing variable names in the Records USABLE_READ_VARS set, or
         Pandas DataFrame is INPUT data containing variable names in
         the Records USABLE_READ_VARS set.  INPUT vsrisbles not in the
         Records USABLE_READ_VARS set can be present but are ignored.
@@ -51,4 +82,925 @@ class TaxCalcIO(tcio):
 
     # pylint: disable=too-many-instance-attributes
 
-    pass
+    def __init__(self, input_data, tax_year, baseline, reform, assump, outdir=None):
+        # pylint: disable=too-many-arguments
+        # key of the SQLite3 database rows written by this object, which
+        # is the BASELINE-REFORM-ASSUMP part of the OUTPUT file name
+        self._sqldb_key = "-".join(
+            "+".join(
+                os.path.splitext(os.path.basename(fname))[0]
+                for fname in arg.split("+")
+            )
+            if isinstance(arg, str)
+            else "#"
+            for arg in [baseline, reform, assump]
+        )
+        if not (
+            isinstance(input_data, str)
+            and input_data.endswith(COLUMNAR_INPUT_EXTENSIONS)
+        ):
+            super().__init__(input_data, tax_year, baseline, reform, assump, outdir)
+            return
+        # the Tax-Calculator constructor accepts only CSV INPUT file names,
+        # so pass it the INPUT file name with a .csv extension, which
+        # produces the same OUTPUT file names, and check the INPUT file here
+        csv_input_data = os.path.splitext(input_data)[0] + ".csv"
+        super().__init__(csv_input_data, tax_year, baseline, reform, assump, outdir)
+        self.errmsg = self.errmsg.replace("ERROR: INPUT file could not be found\n", "")
+        if not os.path.isfile(input_data):
+            self.errmsg += "ERROR: INPUT file could not be found\n"
+        # columnar INPUT is never one of the INPUT files in the package
+        self.puf_input_data = False
+        self.cps_input_data = False
+        self.tmd_input_data = False
+
+    def init(
+        self,
+        input_data,
+        tax_year,
+        baseline,
+        reform,
+        assump,
+        aging_input_data,
+        exact_calculations,
+        chunk_size=None,
+        row_range=None,
+    ):
+        """
+        TaxCalcIO class post-constructor method that completes initialization.
+
+        Parameters
+        ----------
+        First seven are same as those of the Tax-Calculator TaxCalcIO.init
+        method: input_data, tax_year, baseline, reform, assump,
+        aging_input_data, exact_calculations.
+
+        chunk_size: None or positive integer
+            None implies all the INPUT is read into one Records object, or
+            integer is the number of INPUT rows in each block of a chunked
+            analysis, in which the analyze method reads the INPUT one block
+            at a time and computes and writes the output for each block
+            before reading the next one, so that peak memory use depends
+            on chunk_size rather than on the size of the INPUT.  Because
+            each filing unit is computed independently, the output is
+            exactly the same as the output of an unchunked analysis.
+
+        row_range: None or tuple of two integers
+            None implies all INPUT rows are analyzed, or (start, stop)
+            implies only the INPUT rows with zero-based indices in the
+            range(start, stop) are analyzed, which requires a chunk_size
+            and is used to split the analysis among several processes.
+        """
+        # pylint: disable=too-many-arguments
+        if (
+            chunk_size is None
+            and isinstance(input_data, str)
+            and input_data.endswith(COLUMNAR_INPUT_EXTENSIONS)
+        ):
+            input_data = read_input_file(input_data)
+        self.chunk_size = chunk_size
+        self._block_index = 0
+        self._output_format = "csv"
+        self._compression = None
+        self._columnar_writer = None
+        self._sqldb_file = None
+        self._sqldb_writer = None
+        if chunk_size is None:
+            if row_range is not None:
+                self.errmsg = "ERROR: row_range requires a chunk_size\n"
+                return
+            super().init(
+                input_data,
+                tax_year,
+                baseline,
+                reform,
+                assump,
+                aging_input_data,
+                exact_calculations,
+            )
+            return
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            self.errmsg = "ERROR: chunk_size must be a positive integer\n"
+            return
+        if row_range is not None and not 0 <= row_range[0] < row_range[1]:
+            self.errmsg = "ERROR: row_range must be a non-empty (start, stop)\n"
+            return
+        self._input_data = input_data
+        self._row_range = row_range
+        self._aging_input_data = aging_input_data
+        self._exact_calculations = exact_calculations
+        if self.tmd_input_data and aging_input_data:
+            self.errmsg = "ERROR: chunked analysis does not support tmd.csv INPUT\n"
+            return
+        # complete initialization with the first block of INPUT rows, which
+        # are not aged even when aging_input_data is true because analyze
+        # constructs the Calculator objects for each block in turn, and
+        # which analyze uses as its first block rather than reading it again
+        self._blocks = self._input_blocks(row_range)
+        self._first_block = next(self._blocks)
+        super().init(
+            self._first_block[1],
+            tax_year,
+            baseline,
+            reform,
+            assump,
+            False,
+            exact_calculations,
+        )
+        if self.errmsg:
+            return
+        self._init_block_state(baseline)
+        if not aging_input_data:
+            return
+        # read the sample weights, which are sliced into blocks like INPUT
+        data_year, weights_filename, _ = self._aging_specs()
+        self._weights = pd.read_csv(os.path.join(Records.CODE_PATH, weights_filename))
+        if tax_year < data_year:
+            msg = "tax_year {} less than records.data_year {}"
+            msg = msg.format(tax_year, data_year)
+            self.errmsg += "ERROR: {}\n".format(msg)
+        if self.count_input_rows(input_data) != len(self._weights.index):
+            # unlike unchunked analysis, do not scale up sub-sample weights
+            msg = "chunked analysis requires INPUT to have {} rows like {}"
+            msg = msg.format(len(self._weights.index), weights_filename)
+            self.errmsg += "ERROR: {}\n".format(msg)
+
+    def analyze(
+        self,
+        writing_output_file=False,
+        output_tables=False,
+        output_graphs=False,
+        dump_varset=None,
+        output_dump=False,
+        output_sqldb=False,
+        output_format="csv",
+        compression=None,
+        sqldb_file=None,
+    ):
+        """
+        Conduct tax analysis.
+
+        The first six parameters are the same as those of the
+        Tax-Calculator TaxCalcIO.analyze method.  When init was called with
+        a chunk_size, the analysis is done one block of INPUT rows at a
+        time, with each block's output appended to the OUTPUT file and to
+        the SQLite3 database tables; the output_tables and output_graphs
+        options, which need all the INPUT rows at once, are not supported
+        then.
+
+        output_format: string
+            format of the dump OUTPUT file, which is one of the strings in
+            the OUTPUT_FORMATS dictionary; the "parquet" and "feather"
+            columnar formats, which require the pyarrow package, are used
+            only when output_dump is true and write the dump output
+            directly from the Records arrays to a file whose name has a
+            .parquet or .feather extension instead of .csv
+
+        compression: None or string
+            compression codec of a columnar dump OUTPUT file, which is one
+            of the codecs in the OUTPUT_FORMATS dictionary; None implies the
+            first codec listed for the output_format
+
+        sqldb_file: None or string
+            None implies output_sqldb writes the baseline and reform tables
+            to a new SQLite3 database file that has the OUTPUT file name
+            with a .db extension, or string is the name of a (possibly
+            existing) database file to which the table rows are appended
+            after deleting any rows with the same REFORM and YEAR key as
+            the rows being written (see the SQLiteDumpWriter class)
+        """
+        # pylint: disable=too-many-arguments
+        if output_format not in OUTPUT_FORMATS:
+            msg = 'output_format "{}" is not in {}'
+            raise ValueError(msg.format(output_format, sorted(OUTPUT_FORMATS)))
+        codecs = OUTPUT_FORMATS[output_format]
+        if compression is None:
+            compression = codecs[0] if codecs else None
+        elif compression not in codecs:
+            msg = 'compression "{}" is not valid for output_format "{}"'
+            raise ValueError(msg.format(compression, output_format))
+        self._output_format = output_format
+        self._compression = compression
+        self._sqldb_file = sqldb_file
+        self._block_index = 0
+        completed = False
+        try:
+            if self.chunk_size is None:
+                super().analyze(
+                    writing_output_file,
+                    output_tables,
+                    output_graphs,
+                    dump_varset,
+                    output_dump,
+                    output_sqldb,
+                )
+            else:
+                self._analyze_blocks(
+                    writing_output_file,
+                    output_tables,
+                    output_graphs,
+                    dump_varset,
+                    output_dump,
+                    output_sqldb,
+                )
+            completed = True
+        finally:
+            if self._columnar_writer is not None:
+                self._columnar_writer.close()
+                self._columnar_writer = None
+            if self._sqldb_writer is not None:
+                self._sqldb_writer.close(commit=completed)
+                self._sqldb_writer = None
+
+    def dump_filename(self):
+        """
+        Return name of the file to which analyze writes dump output, whose
+        extension depends on the output_format argument of analyze.
+        """
+        if self._output_format == "csv":
+            return self._output_filename
+        ext = ".{}".format(self._output_format)
+        return self._output_filename[: -len(".csv")] + ext
+
+    def write_output_file(self, output_dump, dump_varset, mtr_paytax, mtr_inctax):
+        """
+        Write output to CSV-formatted file, appending to the file after the
+        first block of a chunked analysis, or write dump output to a
+        columnar file when analyze was called with a columnar output_format.
+        """
+        if output_dump and self._output_format != "csv":
+            self._write_columnar_dump(dump_varset, mtr_paytax, mtr_inctax)
+            return
+        if output_dump:
+            outdf = self.dump_output(self.calc, dump_varset, mtr_inctax, mtr_paytax)
+            column_order = sorted(outdf.columns)
+        else:
+            outdf = self.minimal_output()
+            column_order = outdf.columns
+        assert len(outdf.index) == self.calc.array_len
+        appending = self._block_index > 0
+        outdf.to_csv(
+            self._output_filename,
+            columns=column_order,
+            index=False,
+            float_format="%.2f",
+            mode="a" if appending else "w",
+            header=not appending,
+        )
+        del outdf
+        gc.collect()
+
+    def dump_output(self, calcx, dump_varset, mtr_inctax, mtr_paytax):
+        """
+        Extract dump output and return it as Pandas DataFrame, which has
+        the same columns as the Tax-Calculator dump output DataFrame in
+        sorted order.  The DataFrame is built at once from the arrays
+        returned by _dump_columns (rather than by copying the DataFrame as
+        each column is added), so its integer columns are the Records
+        arrays of calcx, which must not be changed while it is used.
+        """
+        if dump_varset is not None:
+            dump_varset = set(dump_varset) | {"FLPDYR"}
+        names, arrays = self._dump_columns(calcx, dump_varset, mtr_inctax, mtr_paytax)
+        return pd.DataFrame(dict(zip(names, arrays)), columns=names, copy=False)
+
+    def write_doc_file(self):
+        """
+        Write reform documentation to text file, which is done just once
+        in a chunked analysis.
+        """
+        if self._block_index == 0:
+            super().write_doc_file()
+
+    def write_sqldb_file(
+        self, dump_varset, mtr_paytax, mtr_inctax, mtr_paytax_base, mtr_inctax_base
+    ):
+        """
+        Write dump output to SQLite3 database tables baseline and reform
+        using a SQLiteDumpWriter, which is opened for the first block of a
+        chunked analysis and whose single transaction is committed at the
+        end of analyze.  Each row also contains the REFORM and YEAR key.
+        """
+        # pylint: disable=too-many-arguments
+        if self._sqldb_writer is None:
+            if self._sqldb_file is None:
+                dbfile = self._output_filename.replace(".csv", ".db")
+                self._sqldb_writer = SQLiteDumpWriter(dbfile, replace=True)
+            else:
+                self._sqldb_writer = SQLiteDumpWriter(self._sqldb_file)
+        for table, calcx, mtrs in [
+            ("baseline", self.calc_base, (mtr_inctax_base, mtr_paytax_base)),
+            ("reform", self.calc, (mtr_inctax, mtr_paytax)),
+        ]:
+            names, arrays = self._dump_columns(calcx, dump_varset, *mtrs)
+            self._sqldb_writer.write(
+                table, self._sqldb_key, self.tax_year(), names, arrays
+            )
+            del arrays
+
+    def count_input_rows(self, input_data):
+        """
+        Return number of filing units (that is, rows) in the INPUT, which
+        is the same input_data as in the TaxCalcIO constructor.  Only the
+        first column of a CSV-formatted INPUT file is read, and only the
+        metadata (or, for an .npz file, the first array) of a Parquet,
+        Feather or .npz INPUT file is read.
+        """
+        if isinstance(input_data, pd.DataFrame):
+            return len(input_data.index)
+        if input_data.endswith(COLUMNAR_INPUT_EXTENSIONS):
+            return _count_columnar_rows(input_data)
+        num_rows = 0
+        for block in pd.read_csv(
+            self._input_path(input_data), usecols=[0], chunksize=100000
+        ):
+            num_rows += len(block.index)
+        return num_rows
+
+    # ----- begin private methods of TaxCalcIO class -----
+
+    def _init_block_state(self, baseline):
+        """
+        Keep the GrowFactors, Policy and Consumption objects used by a
+        chunked analysis to construct the Calculator objects for each
+        block of INPUT rows, which are made from the parameter dictionaries
+        read by the Tax-Calculator TaxCalcIO.init method in the same way as
+        that method makes them, except that the Policy objects are
+        Taxcalc-Payroll Policy objects, which are cheap to copy.
+        """
+        gdiff_baseline = GrowDiff()
+        gdiff_baseline.update_growdiff(self.param_dict["growdiff_baseline"])
+        gdiff_response = GrowDiff()
+        gdiff_response.update_growdiff(self.param_dict["growdiff_response"])
+        self._gfactors_base = GrowFactors()
+        gdiff_baseline.apply_to(self._gfactors_base)
+        self._gfactors_ref = GrowFactors()
+        gdiff_baseline.apply_to(self._gfactors_ref)
+        gdiff_response.apply_to(self._gfactors_ref)
+        basedict = TCCalculator.read_json_param_objects(baseline, None)
+        self._policy_base = TCPPolicy(gfactors=self._gfactors_base)
+        self._policy_base.implement_reform(basedict["policy"], print_warnings=False)
+        if self.specified_reform:
+            self._policy = TCPPolicy(gfactors=self._gfactors_ref)
+        else:
+            self._policy = TCPPolicy(gfactors=self._gfactors_base)
+        for poldict in self.policy_dicts:
+            self._policy.implement_reform(poldict, print_warnings=False)
+        self._policy.set_year(self.tax_year())
+        self._policy_base.set_year(self.tax_year())
+        self._consumption = Consumption()
+        self._consumption.update_consumption(self.param_dict["consumption"])
+
+    def _input_path(self, input_data):
+        """
+        Return path of the INPUT file named input_data.
+        """
+        if self.cps_input_data:
+            return os.path.join(Records.CODE_PATH, "cps.csv.gz")
+        return input_data
+
+    def _input_blocks(self, row_range=None):
+        """
+        Generate (first_row, block) tuples, where block is a DataFrame
+        containing up to chunk_size INPUT rows and first_row is the
+        zero-based INPUT index of its first row.  When row_range is a
+        (start, stop) tuple, only the rows in range(start, stop) are read.
+        """
+        start, stop = (0, None) if row_range is None else row_range
+        if isinstance(self._input_data, pd.DataFrame):
+            data = self._input_data.iloc[start:stop]
+            for offset in range(0, len(data.index), self.chunk_size):
+                block = data.iloc[offset : offset + self.chunk_size]
+                yield (start + offset, block.reset_index(drop=True))
+            return
+        if self._input_data.endswith(COLUMNAR_INPUT_EXTENSIONS):
+            yield from _columnar_input_blocks(
+                self._input_data, start, stop, self.chunk_size
+            )
+            return
+        reader = pd.read_csv(
+            self._input_path(self._input_data),
+            skiprows=range(1, start + 1),
+            nrows=None if stop is None else stop - start,
+            chunksize=self.chunk_size,
+        )
+        first_row = start
+        for block in reader:
+            yield (first_row, block.reset_index(drop=True))
+            first_row += len(block.index)
+
+    def _aging_specs(self):
+        """
+        Return data year, weights filename and adjustment ratios filename
+        of the aged INPUT data.
+        """
+        if self.cps_input_data:
+            return (
+                Records.CPSCSV_YEAR,
+                Records.CPS_WEIGHTS_FILENAME,
+                Records.CPS_RATIOS_FILENAME,
+            )
+        return (
+            Records.PUFCSV_YEAR,
+            Records.PUF_WEIGHTS_FILENAME,
+            Records.PUF_RATIOS_FILENAME,
+        )
+
+    def _block_records(self, first_row, block):
+        """
+        Return reform and baseline Records objects containing the block of
+        INPUT rows for the current tax year, constructed in the same way
+        as init constructs Records objects containing all the INPUT rows.
+        The first_row is the zero-based INPUT index of the block's first row.
+        """
+        tax_year = self.tax_year()
+        if not self._aging_input_data:
+            recs = Records(
+                data=block,
+                start_year=tax_year,
+                gfactors=None,
+                weights=None,
+                adjust_ratios=None,
+                exact_calculations=self._exact_calculations,
+            )
+            recs_base = Records(
+                data=block,
+                start_year=tax_year,
+                gfactors=None,
+                weights=None,
+                adjust_ratios=None,
+                exact_calculations=self._exact_calculations,
+            )
+            return (recs, recs_base)
+        data_year, _, ratios_filename = self._aging_specs()
+        weights = self._weights.iloc[first_row : first_row + len(block.index)]
+        weights = weights.reset_index(drop=True)
+        records = list()
+        for gfactors in (self._gfactors_ref, self._gfactors_base):
+            recs = Records(
+                data=block,
+                start_year=data_year,
+                gfactors=gfactors,
+                weights=weights,
+                adjust_ratios=ratios_filename,
+                exact_calculations=self._exact_calculations,
+            )
+            while recs.current_year < tax_year:
+                recs.increment_year()
+            records.append(recs)
+        return tuple(records)
+
+    def _analyze_blocks(
+        self,
+        writing_output_file,
+        output_tables,
+        output_graphs,
+        dump_varset,
+        output_dump,
+        output_sqldb,
+    ):
+        """
+        Conduct chunked tax analysis one block of INPUT rows at a time.
+        """
+        # pylint: disable=too-many-arguments
+        if output_tables or output_graphs:
+            msg = "chunked analysis cannot write --tables or --graphs output"
+            raise ValueError(msg)
+        if self._first_block is None:
+            blocks = self._input_blocks(self._row_range)
+        else:
+            blocks = itertools.chain([self._first_block], self._blocks)
+            self._first_block = None
+        for first_row, block in blocks:
+            recs, recs_base = self._block_records(first_row, block)
+            self.calc = TCCalculator(
+                policy=self._policy,
+                records=recs,
+                consumption=self._consumption,
+                sync_years=False,
+            )
+            self.calc_base = TCCalculator(
+                policy=self._policy_base,
+                records=recs_base,
+                consumption=self._consumption,
+                sync_years=False,
+            )
+            del recs, recs_base
+            super().analyze(
+                writing_output_file,
+                False,
+                False,
+                dump_varset,
+                output_dump,
+                output_sqldb,
+            )
+            self._block_index += 1
+            gc.collect()
+
+    def _dump_columns(self, calcx, dump_varset, mtr_inctax, mtr_paytax):
+        """
+        Return a list of the sorted names of the dump variables and a list
+        of the arrays containing their values for the calcx object, which
+        are the same values as in the DataFrame returned by dump_output.
+        """
+        recs_vinfo = Records(data=None)  # contains only Records VARINFO
+        if dump_varset is None:
+            varset = recs_vinfo.USABLE_READ_VARS | recs_vinfo.CALCULATED_VARS
+        else:
+            varset = dump_varset
+        names = sorted(varset)
+        arrays = list()
+        for varname in names:
+            if varname == "FLPDYR":
+                vardata = np.full(calcx.array_len, self.tax_year(), np.int64)
+            elif varname == "mtr_inctax":
+                vardata = (mtr_inctax * 100).round(2)
+            elif varname == "mtr_paytax":
+                vardata = (mtr_paytax * 100).round(2)
+            elif varname in recs_vinfo.INTEGER_VARS:
+                vardata = calcx.array(varname)
+            else:
+                vardata = calcx.array(varname).round(2)  # nearest cent
+            arrays.append(vardata)
+        return (names, arrays)
+
+    def _write_columnar_dump(self, dump_varset, mtr_paytax, mtr_inctax):
+        """
+        Write the dump output of the current block of filing units to a
+        Parquet or Feather file, which is opened for the first block and
+        closed at the end of analyze.  The columns are the same as in a
+        CSV dump file, but each column is passed to pyarrow directly from
+        its Records array, without building a pandas DataFrame.
+        """
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+
+        names, arrays = self._dump_columns(
+            self.calc, dump_varset, mtr_inctax, mtr_paytax
+        )
+        table = pa.Table.from_arrays([pa.array(arr) for arr in arrays], names=names)
+        if self._columnar_writer is None:
+            self._columnar_writer = columnar_writer(
+                self.dump_filename(),
+                table.schema,
+                self._output_format,
+                self._compression,
+            )
+        self._columnar_writer.write_table(table)
+
+
+class SQLiteDumpWriter:
+    """
+    Bulk writer of dump output to tables in an SQLite3 database file.
+
+    All the rows written by one SQLiteDumpWriter object are inserted in
+    a single transaction with executemany calls on batches of
+    SQLDB_BATCH_SIZE rows, with the journal kept in memory and without
+    synchronous disk writes.  Indexes on the RECID column and on the
+    YEAR and REFORM columns are built when the writer is closed, after
+    all the rows have been inserted.  Each table row begins with the
+    REFORM and YEAR key columns, so the output of several reforms and
+    tax years can be kept in the same tables: the first time rows with
+    a given key are written to a table, any existing rows with that key
+    are deleted.
+
+    Parameters
+    ----------
+    dbfile: string
+        name of the (possibly existing) SQLite3 database file
+
+    replace: boolean
+        whether or not to drop any existing table before writing to it
+        for the first time, instead of appending to it
+
+    Returns
+    -------
+    class instance: SQLiteDumpWriter
+    """
+
+    def __init__(self, dbfile, replace=False):
+        self.replace = replace
+        self._dbcon = sqlite3.connect(dbfile, isolation_level=None)
+        self._dbcon.execute("PRAGMA journal_mode = MEMORY")
+        self._dbcon.execute("PRAGMA synchronous = OFF")
+        self._dbcon.execute("BEGIN")
+        self._tables = dict()  # table name --> set of cleared keys
+
+    def write(self, table, reform, year, names, arrays):
+        """
+        Insert into table one row for each element of the arrays, which
+        contain the values of the variables named in the names list, with
+        the reform string and year integer in the key columns.
+        """
+        # pylint: disable=too-many-arguments
+        columns = [(name, _sqlite_type(arr.dtype)) for name, arr in zip(names, arrays)]
+        self._prepare_table(table, columns, [(reform, year)])
+        sql = self._insert_sql(table, ["REFORM", "YEAR"] + list(names))
+        num_rows = len(arrays[0]) if arrays else 0
+        for start in range(0, num_rows, SQLDB_BATCH_SIZE):
+            stop = start + SQLDB_BATCH_SIZE
+            values = [arr[start:stop].tolist() for arr in arrays]
+            rows = zip(itertools.repeat(reform), itertools.repeat(year), *values)
+            self._dbcon.executemany(sql, rows)
+
+    def append_table(self, table, part_dbfile):
+        """
+        Insert into table all the rows of the table with the same name in
+        the part_dbfile database, which was written by another
+        SQLiteDumpWriter object, matching columns by name.
+        """
+        part_dbcon = sqlite3.connect(part_dbfile)
+        info = part_dbcon.execute('PRAGMA table_info("{}")'.format(table))
+        columns = [(row[1], row[2]) for row in info]
+        keys = part_dbcon.execute(
+            'SELECT DISTINCT REFORM, YEAR FROM "{}"'.format(table)
+        ).fetchall()
+        self._prepare_table(table, columns[2:], keys)
+        names = [name for name, _ in columns]
+        cursor = part_dbcon.execute(
+            'SELECT {} FROM "{}"'.format(_quoted(names), table)
+        )
+        sql = self._insert_sql(table, names)
+        while True:
+            rows = cursor.fetchmany(SQLDB_BATCH_SIZE)
+            if not rows:
+                break
+            self._dbcon.executemany(sql, rows)
+        part_dbcon.close()
+
+    def close(self, commit=True):
+        """
+        Build the indexes and commit (or, if commit is False, roll back)
+        the transaction, and close the database connection.
+        """
+        if commit:
+            for table in self._tables:
+                self._dbcon.execute(
+                    'CREATE INDEX IF NOT EXISTS "{0}_RECID" ON "{0}" '
+                    "(RECID)".format(table)
+                )
+                self._dbcon.execute(
+                    'CREATE INDEX IF NOT EXISTS "{0}_YEAR" ON "{0}" '
+                    "(YEAR, REFORM)".format(table)
+                )
+            self._dbcon.execute("COMMIT")
+        else:
+            self._dbcon.execute("ROLLBACK")
+        self._dbcon.close()
+
+    def _prepare_table(self, table, columns, keys):
+        """
+        Make sure table exists and has the columns, which is a list of
+        (name, type) tuples not including the key columns, and delete any
+        existing rows that have one of the keys, which is a list of
+        (reform, year) tuples, unless they were written by this writer.
+        """
+        if table not in self._tables:
+            if self.replace:
+                self._dbcon.execute('DROP TABLE IF EXISTS "{}"'.format(table))
+            self._dbcon.execute(
+                'CREATE TABLE IF NOT EXISTS "{}" '
+                "(REFORM TEXT, YEAR INTEGER)".format(table)
+            )
+            self._tables[table] = set()
+        info = self._dbcon.execute('PRAGMA table_info("{}")'.format(table))
+        existing = set(row[1] for row in info)
+        for name, sqltype in columns:
+            if name not in existing:
+                self._dbcon.execute(
+                    'ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(table, name, sqltype)
+                )
+        for key in keys:
+            if key not in self._tables[table]:
+                self._dbcon.execute(
+                    'DELETE FROM "{}" WHERE REFORM = ? AND YEAR = ?'.format(table),
+                    key,
+                )
+                self._tables[table].add(tuple(key))
+
+    @staticmethod
+    def _insert_sql(table, names):
+        """
+        Return SQL statement that inserts a row of the named columns.
+        """
+        return 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+            table, _quoted(names), ", ".join(["?"] * len(names))
+        )
+
+
+def _sqlite_type(dtype):
+    """
+    Return SQLite3 column type for values of the numpy dtype.
+    """
+    return "INTEGER" if np.issubdtype(dtype, np.integer) else "REAL"
+
+
+def _quoted(names):
+    """
+    Return comma-separated string of the double-quoted names.
+    """
+    return ", ".join('"{}"'.format(name) for name in names)
+
+
+def columnar_writer(filepath, schema, output_format, compression):
+    """
+    Return an open pyarrow writer for a Parquet or Feather (version 2,
+    that is, Arrow IPC) file with the specified schema and compression
+    codec, whose write_table method can be called several times before
+    its close method is called.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if compression == "none":
+        compression = None
+    if output_format == "parquet":
+        return pq.ParquetWriter(filepath, schema, compression=compression)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    return pa.ipc.new_file(filepath, schema, options=options)
+
+
+def read_columnar_file(filepath, output_format):
+    """
+    Return pyarrow Table containing the contents of the Parquet or
+    Feather file written by a columnar_writer.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if output_format == "parquet":
+        return pq.read_table(filepath)
+    return pa.ipc.open_file(filepath).read_all()
+
+
+def read_input_file(filepath):
+    """
+    Return Pandas DataFrame containing the INPUT variables in the Parquet,
+    Feather (version 2) or NumPy .npz file named filepath, where an .npz
+    file contains one array for each variable, as written by the numpy
+    savez function.  Only the columns (or arrays) whose names are in the
+    Records USABLE_READ_VARS set are read, so, unlike a CSV-formatted
+    INPUT file, there is neither text parsing nor dtype inference and
+    the other columns are never read.
+    """
+    read_vars = Records(data=None).USABLE_READ_VARS  # only Records VARINFO
+    if filepath.endswith(".npz"):
+        with np.load(filepath) as npz:
+            return pd.DataFrame(
+                {name: npz[name] for name in npz.files if name in read_vars}
+            )
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.feather
+    import pyarrow.parquet as pq
+
+    if filepath.endswith(".parquet"):
+        names = pq.read_schema(filepath).names
+        columns = [name for name in names if name in read_vars]
+        table = pq.read_table(filepath, columns=columns)
+    else:
+        with pa.memory_map(filepath) as source:
+            names = pa.ipc.open_file(source).schema.names
+        columns = [name for name in names if name in read_vars]
+        table = pyarrow.feather.read_table(filepath, columns=columns)
+    return table.to_pandas()
+
+
+def _columnar_input_blocks(filepath, start, stop, block_size):
+    """
+    Generate (first_row, block) tuples for the rows in range(start, stop)
+    of the Parquet, Feather or .npz INPUT file named filepath, where stop
+    can be None to read to the end of the file, block is a DataFrame with
+    the same columns as read_input_file returns for up to block_size of
+    those rows, and first_row is the zero-based file index of the first
+    row of block.  Only the rows in the range are read: the Parquet row
+    groups containing them are read in batches, the record batches of a
+    memory-mapped Feather file are sliced, and the arrays of an .npz file
+    are read a block at a time (see _npz_blocks), so reading one block
+    uses memory for only about block_size rows.
+    """
+    read_vars = Records(data=None).USABLE_READ_VARS  # only Records VARINFO
+    if filepath.endswith(".npz"):
+        yield from _npz_blocks(filepath, read_vars, start, stop, block_size)
+        return
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if filepath.endswith(".parquet"):
+        pfile = pq.ParquetFile(filepath)
+        columns = [name for name in pfile.schema_arrow.names if name in read_vars]
+        row_groups = list()
+        first_row = None
+        row = 0
+        for idx in range(pfile.num_row_groups):
+            num_rows = pfile.metadata.row_group(idx).num_rows
+            if row + num_rows > start and (stop is None or row < stop):
+                row_groups.append(idx)
+                if first_row is None:
+                    first_row = row
+            row += num_rows
+        if not row_groups:
+            return
+        batches = pfile.iter_batches(
+            batch_size=block_size, row_groups=row_groups, columns=columns
+        )
+        yield from _sliced_batches(batches, first_row, start, stop, block_size)
+        return
+    with pa.memory_map(filepath) as source:
+        reader = pa.ipc.open_file(source)
+        columns = [name for name in reader.schema.names if name in read_vars]
+        batches = (
+            reader.get_batch(idx).select(columns)
+            for idx in range(reader.num_record_batches)
+        )
+        yield from _sliced_batches(batches, 0, start, stop, block_size)
+
+
+def _sliced_batches(batches, first_row, start, stop, block_size):
+    """
+    Generate _columnar_input_blocks (first_row, block) tuples from the pyarrow
+    record batches, whose first row has the zero-based file index
+    first_row, converting to DataFrames only the rows in range(start,
+    stop) and reading no batch after the one containing the last row
+    in that range.
+    """
+    row = first_row
+    for batch in batches:
+        low = max(start - row, 0)
+        high = batch.num_rows if stop is None else min(stop - row, batch.num_rows)
+        for offset in range(low, high, block_size):
+            length = min(block_size, high - offset)
+            yield (row + offset, batch.slice(offset, length).to_pandas())
+        row += batch.num_rows
+        if stop is not None and row >= stop:
+            break
+
+
+def _npz_blocks(filepath, read_vars, start, stop, block_size):
+    """
+    Generate _columnar_input_blocks (first_row, block) tuples from the
+    .npz file filepath, whose arrays with names in read_vars are the
+    block columns.  The .npy member of each one-dimensional array is
+    read (through the zipfile module, whether or not it is compressed)
+    from the row start a block at a time, and any other array is read
+    whole and sliced.
+    """
+    with zipfile.ZipFile(filepath) as zfile, contextlib.ExitStack() as stack:
+        columns = dict()
+        num_rows = 0
+        for info in zfile.infolist():
+            name = info.filename[: -len(".npy")]
+            if not info.filename.endswith(".npy") or name not in read_vars:
+                continue
+            member = stack.enter_context(zfile.open(info))
+            version = np.lib.format.read_magic(member)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(member)
+            elif version == (2, 0):
+                shape, _, dtype = np.lib.format.read_array_header_2_0(member)
+            else:
+                shape, dtype = None, None
+            if shape is None or len(shape) != 1 or dtype.hasobject:
+                member.seek(0)
+                columns[name] = np.lib.format.read_array(member)
+            else:
+                member.seek(min(start, shape[0]) * dtype.itemsize, os.SEEK_CUR)
+                columns[name] = (member, dtype)
+            if len(columns) == 1:
+                num_rows = len(columns[name]) if shape is None else shape[0]
+        last = num_rows if stop is None else min(stop, num_rows)
+        for row in range(start, last, block_size):
+            length = min(block_size, last - row)
+            block = dict()
+            for name, column in columns.items():
+                if isinstance(column, np.ndarray):
+                    block[name] = column[row : row + length]
+                else:
+                    member, dtype = column
+                    data = member.read(length * dtype.itemsize)
+                    block[name] = np.frombuffer(data, dtype=dtype)
+            yield (row, pd.DataFrame(block))
+
+
+def _count_columnar_rows(filepath):
+    """
+    Return number of rows in the Parquet, Feather or .npz file filepath.
+    """
+    if filepath.endswith(".npz"):
+        with np.load(filepath) as npz:
+            return len(npz[npz.files[0]])
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if filepath.endswith(".parquet"):
+        return pq.read_metadata(filepath).num_rows
+    with pa.memory_map(filepath) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(
+            reader.get_batch(idx).num_rows
+            for idx in range(reader.num_record_batches)
+        )
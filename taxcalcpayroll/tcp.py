@@ -9,8 +9,12 @@ which can be accessed as 'tcp' from an installed taxcalcpayroll conda package.
 
 import os
 import sys
+import shutil
 import argparse
 import difflib
+import tempfile
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 import taxcalcpayroll as tcp
 
 
@@ -25,11 +29,13 @@ def cli_tcp_main():
     # pylint: disable=too-many-statements,too-many-branches
     # pylint: disable=too-many-return-statements
     # parse command-line arguments:
-    usage_str = "tcp INPUT TAXYEAR {}{}{}{}{}".format(
+    usage_str = "tcp INPUT TAXYEAR {}{}{}{}{}{}{}".format(
         "[--help]\n",
         ("          " "[--baseline BASELINE] [--reform REFORM] [--assump  ASSUMP]\n"),
         ("          " "[--exact] [--tables] [--graphs]\n"),
-        ("          " "[--dump] [--dvars DVARS] [--sqldb] [--outdir OUTDIR]\n"),
+        ("          " "[--dump] [--dvars DVARS] [--sqldb] [--dbfile DBFILE]\n"),
+        ("          " "[--outdir OUTDIR] [--format FORMAT]\n"),
+        ("          " "[--compression COMPRESSION] [--workers WORKERS]\n"),
         ("          " "[--test] [--version]"),
     )
     parser = argparse.ArgumentParser(
@@ -52,7 +58,9 @@ def cli_tcp_main():
             "contains for each filing unit variables used "
             "to compute taxes for TAXYEAR. Specifying "
             '"cps.csv" uses CPS input files included in '
-            "the taxcalcpayroll package."
+            "the taxcalcpayroll package.  INPUT can also "
+            "be a .parquet, .feather or .npz file, from "
+            "which only the input variables are read."
         ),
         default="",
     )
@@ -157,6 +165,19 @@ def cli_tcp_main():
         default=False,
         action="store_true",
     )
+    parser.add_argument(
+        "--dbfile",
+        help=(
+            "DBFILE is name of optional SQLite database file "
+            "to which the --sqldb output is appended, after "
+            "deleting any rows in its tables that have the "
+            "same BASELINE-REFORM-ASSUMP and TAXYEAR key as "
+            "the appended rows.  No --dbfile implies --sqldb "
+            "output is written to a new database file that "
+            "has the OUTPUT file name with a .db extension."
+        ),
+        default=None,
+    )
     parser.add_argument(
         "--outdir",
         help=(
@@ -167,6 +188,41 @@ def cli_tcp_main():
         ),
         default=None,
     )
+    parser.add_argument(
+        "--format",
+        help=(
+            "FORMAT is optional format of the --dump OUTPUT "
+            "file: csv, or the parquet or feather columnar "
+            "formats, which require the pyarrow package and "
+            "write OUTPUT to a file with a .parquet or "
+            ".feather extension.  No --format implies csv."
+        ),
+        default="csv",
+    )
+    parser.add_argument(
+        "--compression",
+        help=(
+            "COMPRESSION is optional compression codec of a "
+            "parquet (snappy, zstd, gzip, brotli, lz4, none) "
+            "or feather (lz4, zstd, none) OUTPUT file.  No "
+            "--compression implies the first codec listed "
+            "for the FORMAT."
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--workers",
+        help=(
+            "WORKERS is optional number of processes among "
+            "which the INPUT filing units are split.  The "
+            "OUTPUT is the same as when using one process, "
+            "but --tables and --graphs cannot be used with "
+            "more than one process.  No --workers implies "
+            "one process."
+        ),
+        type=int,
+        default=1,
+    )
     parser.add_argument(
         "--test",
         help=(
@@ -191,6 +247,13 @@ def cli_tcp_main():
     if args.version:
         sys.stdout.write("Taxcalc-Payroll {}\n".format(tcp.__version__))
         return 0
+    # check FORMAT here rather than with argparse choices, so that the
+    # --version option does not import the taxcalcio module
+    if args.format not in tcp.OUTPUT_FORMATS:
+        msg = "ERROR: FORMAT {} is not one of {}\n"
+        sys.stderr.write(msg.format(args.format, ", ".join(tcp.OUTPUT_FORMATS)))
+        sys.stderr.write("USAGE: tcp --help\n")
+        return 1
     # write test input and expected output files if --test option specified
     if args.test:
         _write_expected_test_output()
@@ -213,19 +276,6 @@ def cli_tcp_main():
         sys.stderr.write("USAGE: tcp --help\n")
         return 1
     aging = inputfn.endswith("puf.csv") or inputfn.endswith("cps.csv")
-    tcpio.init(
-        input_data=inputfn,
-        tax_year=taxyear,
-        baseline=args.baseline,
-        reform=args.reform,
-        assump=args.assump,
-        aging_input_data=aging,
-        exact_calculations=args.exact,
-    )
-    if tcpio.errmsg:
-        sys.stderr.write(tcpio.errmsg)
-        sys.stderr.write("USAGE: tcp --help\n")
-        return 1
     dumpvar_set = None
     if args.dvars and (args.dump or args.sqldb):
         if os.path.exists(args.dvars):
@@ -241,15 +291,73 @@ def cli_tcp_main():
             sys.stderr.write(msg.format(args.dvars))
             sys.stderr.write("USAGE: tcp --help\n")
             return 1
-    # conduct tax analysis
-    tcpio.analyze(
-        writing_output_file=True,
-        output_tables=args.tables,
-        output_graphs=args.graphs,
-        dump_varset=dumpvar_set,
-        output_dump=args.dump,
-        output_sqldb=args.sqldb,
-    )
+    if args.format != "csv":
+        if not args.dump:
+            msg = "ERROR: --format {} requires the --dump option\n"
+            sys.stderr.write(msg.format(args.format))
+            sys.stderr.write("USAGE: tcp --help\n")
+            return 1
+        if importlib.util.find_spec("pyarrow") is None:
+            msg = "ERROR: --format {} requires the pyarrow package\n"
+            sys.stderr.write(msg.format(args.format))
+            sys.stderr.write("USAGE: tcp --help\n")
+            return 1
+    codecs = tcp.OUTPUT_FORMATS[args.format]
+    if args.compression and args.compression not in codecs:
+        msg = "ERROR: COMPRESSION {} is not valid for FORMAT {}\n"
+        sys.stderr.write(msg.format(args.compression, args.format))
+        sys.stderr.write("USAGE: tcp --help\n")
+        return 1
+    if args.dbfile and not args.sqldb:
+        sys.stderr.write("ERROR: --dbfile requires the --sqldb option\n")
+        sys.stderr.write("USAGE: tcp --help\n")
+        return 1
+    if args.workers < 1:
+        sys.stderr.write("ERROR: WORKERS must be a positive integer\n")
+        sys.stderr.write("USAGE: tcp --help\n")
+        return 1
+    if args.workers > 1 and (args.tables or args.graphs):
+        msg = "ERROR: --tables and --graphs require one WORKERS process\n"
+        sys.stderr.write(msg)
+        sys.stderr.write("USAGE: tcp --help\n")
+        return 1
+    # an INPUT with fewer than two rows is analyzed in one process
+    num_rows = tcpio.count_input_rows(inputfn) if args.workers > 1 else 0
+    if num_rows > 1:
+        # conduct tax analysis in several processes
+        errmsg = _analyze_in_parallel(
+            tcpio, inputfn, num_rows, taxyear, args, aging, dumpvar_set
+        )
+        if errmsg:
+            sys.stderr.write(errmsg)
+            sys.stderr.write("USAGE: tcp --help\n")
+            return 1
+    else:
+        tcpio.init(
+            input_data=inputfn,
+            tax_year=taxyear,
+            baseline=args.baseline,
+            reform=args.reform,
+            assump=args.assump,
+            aging_input_data=aging,
+            exact_calculations=args.exact,
+        )
+        if tcpio.errmsg:
+            sys.stderr.write(tcpio.errmsg)
+            sys.stderr.write("USAGE: tcp --help\n")
+            return 1
+        # conduct tax analysis
+        tcpio.analyze(
+            writing_output_file=True,
+            output_tables=args.tables,
+            output_graphs=args.graphs,
+            dump_varset=dumpvar_set,
+            output_dump=args.dump,
+            output_sqldb=args.sqldb,
+            output_format=args.format,
+            compression=args.compression,
+            sqldb_file=args.dbfile,
+        )
     # compare test output with expected test output if --test option specified
     if args.test:
         retcode = _compare_test_output_files()
@@ -260,6 +368,145 @@ def cli_tcp_main():
 # end of cli_tcp_main function code
 
 
+def _analyze_in_parallel(tcpio, inputfn, num_rows, taxyear, args, aging, dumpvar_set):
+    """
+    Private function that splits the num_rows (which must be at least
+    two) INPUT rows into args.workers contiguous partitions, analyzes
+    each partition in a separate process and merges the partition output
+    files (in INPUT row order) into the output files named by the tcpio
+    object; returns an error message, which is empty when there are no
+    errors.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    assert num_rows > 1
+    num_parts = min(args.workers, num_rows)
+    bounds = [(num_rows * part) // num_parts for part in range(num_parts + 1)]
+    tmpdir = tempfile.mkdtemp(prefix="tcp-")
+    try:
+        kwargs_list = list()
+        for part in range(num_parts):
+            outdir = os.path.join(tmpdir, str(part))
+            os.mkdir(outdir)
+            kwargs_list.append(
+                dict(
+                    input_data=inputfn,
+                    tax_year=taxyear,
+                    baseline=args.baseline,
+                    reform=args.reform,
+                    assump=args.assump,
+                    outdir=outdir,
+                    aging_input_data=aging,
+                    exact_calculations=args.exact,
+                    row_range=(bounds[part], bounds[part + 1]),
+                    dump_varset=dumpvar_set,
+                    output_dump=args.dump,
+                    output_sqldb=args.sqldb,
+                    output_format=args.format,
+                    compression=args.compression,
+                )
+            )
+        with ProcessPoolExecutor(max_workers=num_parts) as executor:
+            results = list(executor.map(_analyze_partition, kwargs_list))
+        errmsgs = [errmsg for errmsg, _ in results if errmsg]
+        if errmsgs:
+            return errmsgs[0]
+        part_filenames = [filename for _, filename in results]
+        # pylint: disable=protected-access
+        _merge_partition_output(part_filenames, tcpio._output_filename, args)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return ""
+
+
+def _analyze_partition(kwargs):
+    """
+    Private function that analyzes the INPUT rows in kwargs["row_range"]
+    in a worker process; returns a tuple containing an error message and
+    the name of the partition output file.
+    """
+    tcpio = tcp.TaxCalcIO(
+        input_data=kwargs["input_data"],
+        tax_year=kwargs["tax_year"],
+        baseline=kwargs["baseline"],
+        reform=kwargs["reform"],
+        assump=kwargs["assump"],
+        outdir=kwargs["outdir"],
+    )
+    start, stop = kwargs["row_range"]
+    tcpio.init(
+        input_data=kwargs["input_data"],
+        tax_year=kwargs["tax_year"],
+        baseline=kwargs["baseline"],
+        reform=kwargs["reform"],
+        assump=kwargs["assump"],
+        aging_input_data=kwargs["aging_input_data"],
+        exact_calculations=kwargs["exact_calculations"],
+        chunk_size=stop - start,
+        row_range=(start, stop),
+    )
+    if tcpio.errmsg:
+        return (tcpio.errmsg, None)
+    tcpio.analyze(
+        writing_output_file=True,
+        dump_varset=kwargs["dump_varset"],
+        output_dump=kwargs["output_dump"],
+        output_sqldb=kwargs["output_sqldb"],
+        output_format=kwargs["output_format"],
+        compression=kwargs["compression"],
+    )
+    return ("", tcpio._output_filename)  # pylint: disable=protected-access
+
+
+def _merge_partition_output(part_filenames, output_filename, args):
+    """
+    Private function that concatenates the partition output files, whose
+    names are in the part_filenames list, into the output_filename file
+    (and into the corresponding -doc.text and .db files), where the
+    output_filename extension is replaced by the columnar args.format
+    when there is a columnar dump.
+    """
+    if args.format == "csv" or not args.dump:
+        with open(output_filename, "w") as ofile:
+            for part, part_filename in enumerate(part_filenames):
+                with open(part_filename) as pfile:
+                    if part > 0:
+                        pfile.readline()  # skip the column-name header line
+                    shutil.copyfileobj(pfile, ofile)
+    else:
+        ext = ".{}".format(args.format)
+        writer = None
+        for part_filename in part_filenames:
+            table = tcp.read_columnar_file(
+                part_filename.replace(".csv", ext), args.format
+            )
+            if writer is None:
+                writer = tcp.columnar_writer(
+                    output_filename.replace(".csv", ext),
+                    table.schema,
+                    args.format,
+                    args.compression or tcp.OUTPUT_FORMATS[args.format][0],
+                )
+            writer.write_table(table)
+            del table
+        writer.close()
+    shutil.copyfile(
+        part_filenames[0].replace(".csv", "-doc.text"),
+        output_filename.replace(".csv", "-doc.text"),
+    )
+    if not args.sqldb:
+        return
+    if args.dbfile is None:
+        writer = tcp.SQLiteDumpWriter(
+            output_filename.replace(".csv", ".db"), replace=True
+        )
+    else:
+        writer = tcp.SQLiteDumpWriter(args.dbfile)
+    for part_filename in part_filenames:
+        for table in ["baseline", "reform"]:
+            writer.append_table(table, part_filename.replace(".csv", ".db"))
+    writer.close()
+
+
 EXPECTED_TEST_OUTPUT_FILENAME = "test-{}-out.csv".format(str(TEST_TAXYEAR)[2:])
 ACTUAL_TEST_OUTPUT_FILENAME = "test-{}-#-#-#.csv".format(str(TEST_TAXYEAR)[2:])
 
@@ -4,6 +4,7 @@ import glob
 import numpy
 import pandas
 import pytest
+import taxcalc
 
 from pytest_harvest import get_session_results_df
 
@@ -55,6 +56,82 @@ def puf_subsample(puf_fullsample):
     return puf_fullsample.sample(frac=0.05, random_state=2222)
 
 
+@pytest.fixture(scope="session")
+def payroll_sample():
+    """
+    Synthetic filing units with wage, pension-contribution and
+    self-employment income that span every payroll-tax kink.
+    """
+    rng = numpy.random.RandomState(123456789)
+    num = 2000
+    mars = rng.choice([1, 2, 3, 4], size=num)
+    married = mars == 2
+
+    def amounts(mean, sigma, share, negative_share=0.0):
+        amt = rng.lognormal(mean, sigma, num) * (rng.uniform(size=num) < share)
+        sign = numpy.where(rng.uniform(size=num) < negative_share, -1.0, 1.0)
+        return numpy.round(amt * sign, 2)
+
+    sdf = pandas.DataFrame()
+    sdf["RECID"] = numpy.arange(1, num + 1)
+    sdf["MARS"] = mars
+    sdf["XTOT"] = numpy.where(married, 2, 1)
+    sdf["s006"] = numpy.round(rng.uniform(50.0, 150.0, num), 2)
+    sdf["e00200p"] = amounts(10.8, 1.1, 0.85)
+    sdf["e00200s"] = numpy.where(married, amounts(10.5, 1.1, 0.60), 0.0)
+    sdf["e00200"] = sdf["e00200p"] + sdf["e00200s"]
+    sdf["pencon_p"] = numpy.round(0.05 * sdf["e00200p"], 2)
+    sdf["pencon_s"] = numpy.round(0.05 * sdf["e00200s"], 2)
+    sdf["e00900p"] = amounts(10.0, 1.3, 0.25, negative_share=0.2)
+    sdf["e00900s"] = numpy.where(married, amounts(9.5, 1.3, 0.15), 0.0)
+    sdf["e00900"] = sdf["e00900p"] + sdf["e00900s"]
+    sdf["e02100p"] = amounts(9.0, 1.0, 0.05, negative_share=0.3)
+    sdf["e02100s"] = 0.0
+    sdf["e02100"] = sdf["e02100p"] + sdf["e02100s"]
+    sdf["k1bx14p"] = amounts(10.0, 1.5, 0.10)
+    sdf["k1bx14s"] = numpy.where(married, amounts(9.0, 1.0, 0.05), 0.0)
+    sdf["e00300"] = amounts(7.0, 1.5, 0.40)
+    sdf["p23250"] = amounts(9.0, 2.0, 0.10)
+    return sdf
+
+
+@pytest.fixture(scope="session")
+def payroll_weights(payroll_sample):
+    """
+    Sample weights of the payroll_sample filing units for the years 2020
+    through 2034, which are their s006 weights in every year.
+    """
+    return pandas.DataFrame(
+        {"WT{}".format(yr): payroll_sample["s006"] * 100 for yr in range(2020, 2035)}
+    )
+
+
+@pytest.fixture
+def payroll_records(payroll_sample):
+    """
+    Tax-Calculator Records object containing the payroll_sample data for
+    2020, which are not aged.
+    """
+    return taxcalc.Records(
+        data=payroll_sample, start_year=2020, gfactors=None, weights=None
+    )
+
+
+@pytest.fixture
+def aged_payroll_records(payroll_sample, payroll_weights):
+    """
+    Tax-Calculator Records object containing the payroll_sample data for
+    2020, which are aged using the default growth factors and the
+    payroll_weights.
+    """
+    return taxcalc.Records(
+        data=payroll_sample,
+        start_year=2020,
+        gfactors=taxcalc.GrowFactors(),
+        weights=payroll_weights,
+    )
+
+
 @pytest.fixture(scope="session", name="test_reforms_init")
 def fixture_test_reforms(tests_path):
     """
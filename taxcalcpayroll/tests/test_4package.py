@@ -8,9 +8,12 @@ Tests for package existence and dependencies consistency.
 
 import os
 import re
+import sys
+import importlib
 import subprocess
 import yaml
 import pytest
+import taxcalcpayroll
 
 
 @pytest.mark.local
@@ -34,6 +37,7 @@ def test_for_consistency(tests_path):
     dev_pkgs = set(
         [
             "fsspec<=0.8.7",
+            "pyarrow",
             "pytest",
             "pytest-pep8",
             "pytest-xdist",
@@ -69,3 +73,116 @@ def test_for_consistency(tests_path):
     # confirm that extras in env (relative to run) equal the dev_pkgs set
     extras = env - run
     assert extras == dev_pkgs
+
+
+def test_lazy_package_names():
+    """
+    Ensure that each taxcalcpayroll.LAZY_NAMES name is the same object
+    that the former star imports of the STAR_MODULES would provide.
+    """
+    star = dict()
+    for modname in taxcalcpayroll.STAR_MODULES:
+        module = importlib.import_module("taxcalcpayroll." + modname)
+        star.update(
+            (name, value)
+            for name, value in vars(module).items()
+            if not name.startswith("_")
+        )
+    for name, modname in taxcalcpayroll.LAZY_NAMES.items():
+        assert modname in taxcalcpayroll.STAR_MODULES
+        assert getattr(taxcalcpayroll, name) is star[name]
+    assert taxcalcpayroll.Records is star["Records"]
+    assert taxcalcpayroll.tcp.__name__ == "taxcalcpayroll.tcp"
+    with pytest.raises(AttributeError):
+        getattr(taxcalcpayroll, "no_such_name")
+
+
+STAR_IMPORT_SCRIPT = """
+import sys
+import taxcalcpayroll
+assert "taxcalc" not in sys.modules
+from taxcalcpayroll import *
+from taxcalcpayroll.calculator import Calculator as TCPCalculator
+from taxcalcpayroll.sweep import payroll_sweep as sweep_function
+assert Calculator is TCPCalculator
+assert payroll_sweep is sweep_function
+assert Records is taxcalcpayroll.calculator.Records
+assert TaxCalcIO.__module__ == "taxcalcpayroll.taxcalcio"
+assert calculator is taxcalcpayroll.calculator
+assert "_public_names" not in dir()
+print(len(taxcalcpayroll.__all__))
+"""
+
+
+def test_star_import():
+    """
+    Ensure that a star import of taxcalcpayroll imports the public names
+    of the STAR_MODULES, as when the package star-imported them.
+    """
+    out = subprocess.run(
+        [sys.executable, "-c", STAR_IMPORT_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert int(out.stdout.split()[-1]) > len(taxcalcpayroll.LAZY_NAMES)
+
+
+IMPORT_SCRIPT = """
+import sys
+import time
+time0 = time.time()
+{}
+time1 = time.time()
+heavy = [mod for mod in ("pandas", "paramtools", "taxcalc") if mod in sys.modules]
+print("{{:.3f}} {{}}".format(time1 - time0, ",".join(heavy) or "none"))
+"""
+
+
+def import_time(statement):
+    """
+    Return (seconds, heavy_modules) tuple for executing the import
+    statement in a new Python process.
+    """
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT.format(statement)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    seconds, heavy = out.stdout.splitlines()[-1].split()
+    return float(seconds), heavy
+
+
+def test_lazy_package_import():
+    """
+    Ensure that importing the package (or asking the tcp CLI for its
+    version) does not import pandas, paramtools or taxcalc.
+    """
+    assert import_time("import taxcalcpayroll")[1] == "none"
+    version = (
+        "sys.argv = ['tcp', '--version']\n"
+        "from taxcalcpayroll.tcp import cli_tcp_main\n"
+        "cli_tcp_main()"
+    )
+    assert import_time(version)[1] == "none"
+
+
+@pytest.mark.pre_release
+def test_import_time_benchmark():
+    """
+    Report time for importing the package, for asking the tcp CLI for
+    its version, and for importing single names from the package.
+    """
+    statements = [
+        "import taxcalcpayroll",
+        "import taxcalcpayroll.tcp",
+        "from taxcalcpayroll import EI_PayrollTax",
+        "from taxcalcpayroll import Calculator",
+        "from taxcalcpayroll import TaxCalcIO",
+    ]
+    print("\nseconds to import in a new process:")
+    for statement in statements:
+        seconds, heavy = import_time(statement)
+        print("{:8.3f}  {}  ({})".format(seconds, statement, heavy))
+    assert import_time("import taxcalcpayroll")[0] < 0.5
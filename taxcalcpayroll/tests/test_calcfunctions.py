@@ -428,3 +428,73 @@ def test_EI_PayrollTax(test_tuple, expected_value, skip_jit):
 
     assert np.allclose(test_value, expected_value)
 
+
+@pytest.mark.parametrize(
+    "test_tuple,expected_value",
+    [
+        (tuple1, expected1),
+        (tuple2, expected2),
+        (tuple3, expected3),
+        (tuple4, expected4),
+        (tuple5, expected5),
+        (tuple6, expected6),
+    ],
+    ids=["case 1", "case 2", "case 3", "case 4", "case 5", "case 6"],
+)
+def test_EI_PayrollTax_vec(test_tuple, expected_value, skip_jit):
+    """
+    Tests the EI_PayrollTax_vec function using scalar arguments
+    """
+    test_value = calcfunctions.EI_PayrollTax_vec(*test_tuple)
+    assert np.allclose(test_value, expected_value)
+
+
+def test_EI_PayrollTax_vec_arrays(skip_jit):
+    """
+    Tests that EI_PayrollTax_vec applied to stacked arrays gives the same
+    results as EI_PayrollTax applied to each filing unit
+    """
+    policy_idx = (0, 5, 6, 7, 8, 9, 10, 11)
+    tuples = [
+        tup
+        for tup in (tuple1, tuple2, tuple3, tuple4, tuple5, tuple6)
+        if all(tup[idx] == tuple1[idx] for idx in policy_idx)
+    ]
+    args = list()
+    for idx in range(len(tuple1)):
+        if idx in policy_idx:
+            args.append(tuple1[idx])
+        elif tuple1[idx] is None:
+            args.append(None)
+        else:
+            args.append(np.array([tup[idx] for tup in tuples], dtype=np.float64))
+    test_value = np.column_stack(calcfunctions.EI_PayrollTax_vec(*args))
+    for row, tup in enumerate(tuples):
+        assert np.allclose(test_value[row], calcfunctions.EI_PayrollTax(*tup))
+
+
+def test_AdditionalMedicareTax_vec(skip_jit):
+    """
+    Tests that AdditionalMedicareTax_vec gives the same results as
+    AdditionalMedicareTax for each filing unit
+    """
+    e00200 = np.array([0.0, 150000.0, 260000.0, 300000.0, 90000.0])
+    mars = np.array([1, 2, 2, 3, 4], dtype=np.int32)
+    amedt_ec = np.array([200000.0, 250000.0, 125000.0, 200000.0, 200000.0])
+    sey = np.array([300000.0, 120000.0, -5000.0, 0.0, 0.0])
+    payrolltax = np.array([100.0, 200.0, 300.0, 400.0, 500.0])
+    rates = (0.009, 0.0145, 0.0145, 0.062, 0.062)
+    ptax_amc, ptax = calcfunctions.AdditionalMedicareTax_vec(
+        e00200, mars, amedt_ec, sey, *rates, None, payrolltax
+    )
+    for idx in range(len(e00200)):
+        exp_amc, exp_ptax = calcfunctions.AdditionalMedicareTax(
+            e00200[idx],
+            mars[idx],
+            amedt_ec,
+            sey[idx],
+            *rates,
+            None,
+            payrolltax[idx]
+        )
+        assert np.allclose([ptax_amc[idx], ptax[idx]], [exp_amc, exp_ptax])
@@ -0,0 +1,43 @@
+# CODING-STYLE CHECKS:
+# pycodestyle test_calcgraph.py
+
+from taxcalcpayroll.calcgraph import calc_function_variables, required_read_variables
+
+
+def test_calc_function_variables():
+    """
+    Test variables used and set by the calcfunctions functions.
+    """
+    functions = calc_function_variables()
+    inputs, outputs = functions["EI_PayrollTax"]
+    assert {"e00200p", "pencon_s", "k1bx14p"} <= inputs
+    assert {"payrolltax", "ptax_was", "setax"} <= outputs
+    assert "FICA_ss_trt_employer" not in inputs
+    assert functions["EI_PayrollTax_vec"][1] == outputs
+    inputs, outputs = functions["BenefitPrograms"]
+    assert "housing_ben" in inputs
+    assert "benefit_cost_total" in outputs
+    assert "SchXYZ" not in functions  # not an apply-style function
+
+
+def test_required_read_variables():
+    """
+    Test read variables needed to calculate payroll and income taxes.
+    """
+    payroll = required_read_variables(["payrolltax", "ptax_amc"])
+    assert payroll == {
+        "MARS",
+        "e00200",
+        "e00200p",
+        "e00200s",
+        "pencon_p",
+        "pencon_s",
+        "e00900p",
+        "e00900s",
+        "e02100p",
+        "e02100s",
+        "k1bx14p",
+        "k1bx14s",
+    }
+    assert payroll < required_read_variables(["iitax"])
+    assert required_read_variables(["e00200p"]) == {"e00200p"}
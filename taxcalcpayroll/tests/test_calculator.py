@@ -11,10 +11,12 @@ Tests of Calculator class.
 import os
 from io import StringIO
 import copy
+import collections
 import pytest
 import numpy as np
 import pandas as pd
 from taxcalc import Policy, Records, Calculator, Consumption
+import taxcalcpayroll as tcp
 
 
 def test_make_calculator(cps_subsample):
@@ -126,6 +128,51 @@ def test_calculator_advance_to_year(cps_subsample):
         calc.advance_to_year(2015)
 
 
+def test_calculator_aged_records_cache(aged_payroll_records, monkeypatch):
+    """
+    Test that Calculator objects that extrapolate the same data to the same
+    year reuse the aged Records arrays and get the same results.
+    """
+    monkeypatch.setattr(tcp.calculator, "_AGED_RECORDS", collections.OrderedDict())
+    monkeypatch.setattr(tcp.calculator, "AGED_RECORDS_CACHE_SIZE", 0)
+    with pytest.raises(ValueError):
+        tcp.set_aged_records_cache_size(-1)
+    recs = aged_payroll_records
+    changed_recs = copy.deepcopy(recs)
+    changed_recs.e00200p = changed_recs.e00200p * 1.1
+    changed_recs.e00200 = changed_recs.e00200p + changed_recs.e00200s
+    calcs = list()
+    for cache_size, rec in [(0, recs), (4, recs), (4, recs), (0, changed_recs)]:
+        tcp.set_aged_records_cache_size(cache_size)
+        calc = tcp.Calculator(policy=Policy(), records=rec)
+        calc.advance_to_year(2026)
+        calc.calc_all()
+        calcs.append(calc)
+    assert tcp.set_aged_records_cache_size(4) == 0
+    calc = tcp.Calculator(policy=Policy(), records=changed_recs)
+    calc.advance_to_year(2026)
+    calc.calc_all()
+    calcs.append(calc)
+    aged_records = tcp.calculator._AGED_RECORDS  # pylint: disable=protected-access
+    assert len(aged_records) == 1  # because the size was set to zero
+    assert tcp.set_aged_records_cache_size(1) == 4
+    assert len(aged_records) == 1
+    tcp.clear_aged_records_cache()
+    assert not aged_records
+    assert tcp.set_aged_records_cache_size(0) == 1
+    assert recs.current_year == 2020
+    for calc in calcs:
+        assert calc.current_year == 2026
+        assert calc.policy_param("SS_Earnings_c") == calcs[0].policy_param(
+            "SS_Earnings_c"
+        )
+    assert not np.allclose(calcs[0].array("e00200p"), calcs[3].array("e00200p"))
+    pairs = [(calcs[0], calcs[1]), (calcs[0], calcs[2]), (calcs[3], calcs[4])]
+    for expected, calc in pairs:
+        for varname in recs.USABLE_READ_VARS | recs.CALCULATED_VARS | {"s006"}:
+            assert np.array_equal(expected.array(varname), calc.array(varname))
+
+
 def test_make_calculator_raises_on_no_policy(cps_subsample):
     """
     Test Calculator ctor error with no policy argument.
@@ -563,6 +610,298 @@ def test_calc_all():
     assert calc.current_year == cyr
 
 
+def test_calc_payroll(payroll_records):
+    """
+    Test calc_payroll method produces same payroll taxes as calc_all method.
+    """
+    recs = payroll_records
+    calc_all = tcp.Calculator(policy=Policy(), records=recs)
+    calc_all.calc_all()
+    calc_pay = tcp.Calculator(policy=Policy(), records=recs)
+    calc_pay.calc_payroll()
+    for varname in tcp.Calculator.PAYROLL_VARIABLES + ["sey", "c03260", "earned"]:
+        assert np.allclose(
+            calc_pay.array(varname), calc_all.array(varname), rtol=0.0, atol=0.0
+        )
+    assert calc_pay.weighted_total("payrolltax") > 0.0
+    # income-tax chain is skipped, so income-tax variables remain zero
+    assert np.allclose(calc_pay.array("iitax"), 0.0)
+    assert not np.allclose(calc_all.array("iitax"), 0.0)
+
+
+def test_calc_vectorized(payroll_records):
+    """
+    Test vectorized NumPy payroll functions produce same results as the
+    iterate_jit-decorated payroll functions.
+    """
+    recs = payroll_records
+    reform = {"SS_Earnings_c": {2020: 200000}, "AMEDT_rt": {2020: 0.01}}
+    pol = Policy()
+    pol.implement_reform(reform)
+    calc_vec = tcp.Calculator(policy=pol, records=recs, vectorized=True)
+    calc_vec.calc_all()
+    calc_jit = tcp.Calculator(policy=pol, records=recs, vectorized=False)
+    calc_jit.calc_all()
+    for varname in tcp.Calculator.PAYROLL_VARIABLES + ["sey", "c03260", "iitax"]:
+        assert np.allclose(
+            calc_vec.array(varname), calc_jit.array(varname), rtol=0.0, atol=0.0
+        )
+
+
+@pytest.mark.parametrize(
+    "reform",
+    [
+        {},
+        {"STD": {2020: [20000, 40000, 20000, 30000, 40000]}},
+        {"ID_Charity_hc": {2020: 0.5}, "AMT_rt1": {2020: 0.3}},
+    ],
+)
+def test_calc_fused_itemization(payroll_sample, reform):
+    """
+    Test that picking the taxes with the optimal deduction produces the
+    same results as calculating them a third time.
+    """
+    rng = np.random.RandomState(987654321)
+    sdf = payroll_sample.copy()
+    for varname in ["e17500", "e18400", "e19200", "e19800", "e20400"]:
+        sdf[varname] = np.round(
+            rng.lognormal(9.0, 1.0, len(sdf)) * (rng.uniform(size=len(sdf)) < 0.4), 2
+        )
+    recs = Records(data=sdf, start_year=2020, gfactors=None, weights=None)
+    pol = Policy()
+    pol.implement_reform(reform)
+    calcs = list()
+    for fused in [False, True]:
+        calc = tcp.Calculator(policy=pol, records=recs, fused_itemization=fused)
+        calc.calc_all()
+        calcs.append(calc)
+    assert (calcs[1].array("c04470") > 0.0).any()
+    assert (calcs[1].array("standard") > 0.0).any()
+    for varname in recs.CALCULATED_VARS:
+        assert np.array_equal(calcs[0].array(varname), calcs[1].array(varname))
+
+
+@pytest.mark.parametrize(
+    "reform",
+    [
+        {},
+        {"ID_BenefitSurtax_crt": {2020: 0.5}, "ID_BenefitSurtax_trt": {2020: 0.1}},
+        {"FST_AGI_trt": {2020: 0.3}, "ID_BenefitCap_rt": {2020: 0.5}},
+    ],
+)
+@pytest.mark.parametrize(
+    "changed_vars", [["pencon_p"], ["e00200p", "e00200"], ["e18400"], ["XTOT"]]
+)
+def test_calc_recalc(payroll_records, reform, changed_vars):
+    """
+    Test that recalc method produces the same results as calc_all method
+    after changing some Records input variables.
+    """
+    recs = payroll_records
+    pol = Policy()
+    pol.implement_reform(reform)
+    calc = tcp.Calculator(policy=pol, records=recs)
+    calc.calc_all()
+    calc_all = copy.deepcopy(calc)
+    rng = np.random.RandomState(987654321)
+    changed = rng.uniform(size=recs.array_length) < 0.2
+    for varname in changed_vars:
+        value = calc.array(varname)
+        if varname == "XTOT":
+            value = value + changed
+        elif varname == "e00200":
+            value = calc.array("e00200p") + calc.array("e00200s")
+        else:
+            value = np.where(changed, value * 1.5 + 5000.0, value)
+        calc.array(varname, value)
+        calc_all.array(varname, value.copy())
+    steps = calc.recalc(changed_vars)
+    calc_all.calc_all()
+    assert steps
+    assert set(steps) < set(tcp.calculator.CALC_ALL_STEPS)
+    for varname in recs.CALCULATED_VARS:
+        assert np.array_equal(calc.array(varname), calc_all.array(varname))
+
+
+def test_calc_recalc_skipped_steps(payroll_records):
+    """
+    Test that recalc method calls only the steps that can be changed and
+    raises an error for names that are not Records input variables.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs)
+    calc.calc_all()
+    assert calc.recalc([]) == []
+    steps = calc.recalc(["e00200p"])  # without changing e00200p
+    assert steps == ["EI_PayrollTax", "AdditionalMedicareTax"]
+    calc.array("e03150", calc.array("e03150") + 100.0)
+    steps = calc.recalc(["e03150"])
+    assert steps[0] == "Adj"
+    assert "EI_PayrollTax" not in steps
+    with pytest.raises(ValueError):
+        calc.recalc(["iitax"])
+    with pytest.raises(ValueError):
+        calc.recalc(["unknown_variable"])
+
+
+def test_calc_zero_copy_dataframe(payroll_records):
+    """
+    Test dataframe method with zero_copy option and diagnostic_table
+    method, which uses that option.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs)
+    calc.calc_all()
+    varlist = ["RECID", "MARS", "e00200", "payrolltax", "iitax"]
+    vdf = calc.dataframe(varlist, zero_copy=True)
+    assert list(vdf.columns) == varlist
+    for varname in varlist:
+        assert vdf[varname].dtype == calc.array(varname).dtype
+        assert np.shares_memory(vdf[varname].values, calc.array(varname))
+    assert np.allclose(vdf.values, calc.dataframe(varlist).values)
+    with pytest.raises(ValueError):
+        vdf.loc[0, "iitax"] = 1.0
+    # diagnostic_table uses each year's zero-copy DataFrame before the
+    # calculations for the next year change the Records arrays in place
+    frames = list()
+    years = list()
+    for _ in range(3):
+        calc.calc_all()
+        years.append(calc.current_year)
+        frames.append(calc.dataframe(tcp.calculator.DIST_VARIABLES))
+        calc.increment_year()
+    calc = tcp.Calculator(policy=Policy(), records=recs)
+    adt = calc.diagnostic_table(3)
+    expected = tcp.calculator.create_diagnostic_table(frames, years)
+    pd.testing.assert_frame_equal(adt, expected)
+
+
+def test_calc_payroll_batch(payroll_records):
+    """
+    Test calc_payroll_batch method produces same payroll taxes as
+    calc_payroll method of a Calculator object for each reform.
+    """
+    recs = payroll_records
+    reforms = [
+        {},
+        {"FICA_ss_trt_employer": {2020: 0.07}, "SS_Earnings_c": {2020: 180000}},
+        {"SS_Earnings_thd": {2020: 250000}, "AMEDT_rt": {2020: 0.012}},
+        {"AMEDT_ec": {2020: [150000, 200000, 100000, 150000, 150000]}},
+    ]
+    calc = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    batch = calc.calc_payroll_batch(reforms)
+    assert list(batch.columns) == tcp.Calculator.PAYROLL_VARIABLES
+    assert batch.index.names == ["reform", "RECID"]
+    assert len(batch.index) == len(reforms) * calc.array_len
+    # batch calculation leaves calc unchanged
+    assert np.allclose(calc.array("payrolltax"), 0.0)
+    for rnum, reform in enumerate(reforms):
+        pol = Policy()
+        pol.implement_reform(reform)
+        rcalc = tcp.Calculator(policy=pol, records=recs, vectorized=True)
+        rcalc.calc_payroll()
+        for varname in tcp.Calculator.PAYROLL_VARIABLES:
+            assert np.allclose(
+                batch.loc[rnum][varname].values,
+                rcalc.array(varname),
+                rtol=0.0,
+                atol=0.0,
+            )
+    with pytest.raises(ValueError):
+        calc.calc_payroll_batch([])
+    with pytest.raises(ValueError):
+        calc.calc_payroll_batch(reforms, variables=["iitax"])
+
+
+def test_store_restore_records(payroll_records):
+    """
+    Test store_records and restore_records methods copy only the arrays
+    that are changed between the two calls.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    calc.calc_all()
+    wages = calc.array("e00200p")
+    wages_copy = wages.copy()
+    ptax = calc.array("payrolltax")
+    ptax_copy = ptax.copy()
+    interest = calc.array("e00300")
+    calc.store_records()
+    calc.array("e00200p", wages + 1000.0)
+    calc.calc_all()
+    ptax_chng = calc.array("payrolltax")
+    assert ptax_chng is not ptax  # copied before being changed in place
+    assert calc.array("e00300") is interest  # unchanged arrays are not copied
+    assert not np.allclose(ptax_chng, ptax_copy)
+    calc.restore_records()
+    assert calc.array("e00200p") is wages
+    assert calc.array("payrolltax") is ptax
+    assert np.allclose(wages, wages_copy, rtol=0.0, atol=0.0)
+    assert np.allclose(ptax, ptax_copy, rtol=0.0, atol=0.0)
+    # mtr leaves calc in same state as calc_all
+    calc.mtr("e00200p")
+    calc_base = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    calc_base.calc_all()
+    for varname in ["e00200p", "e00200", "payrolltax", "iitax", "c00100"]:
+        assert np.allclose(
+            calc.array(varname), calc_base.array(varname), rtol=0.0, atol=0.0
+        )
+
+
+def test_multi_mtr(payroll_records):
+    """
+    Test multi_mtr method produces same marginal tax rates as mtr method.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    varlist = ["e00200p", "e00200s", "e00900p", "k1bx14p", "p23250"]
+    expected = {varstr: calc.mtr(varstr) for varstr in varlist}
+    for num_workers in [1, 2]:
+        actual = calc.multi_mtr(varlist, num_workers=num_workers)
+        assert list(actual.keys()) == varlist
+        for varstr in varlist:
+            for act, exp in zip(actual[varstr], expected[varstr]):
+                assert np.allclose(act, exp, rtol=0.0, atol=0.0, equal_nan=True)
+    with pytest.raises(ValueError):
+        calc.multi_mtr(["e00200p", "bad_variable"])
+
+
+def test_payroll_mtr(payroll_records):
+    """
+    Test payroll_mtr method produces same marginal payroll tax rates as
+    the finite-difference mtr method away from payroll tax kinks.
+    """
+    recs = payroll_records
+    pol = Policy()
+    pol.implement_reform(
+        {"SS_Earnings_thd": {2020: 250000.0}, "SECA_Earnings_thd": {2020: 5000.0}}
+    )
+    calc = tcp.Calculator(policy=pol, records=recs, vectorized=True)
+    varlist = ["e00200p", "e00200s", "e00900p", "k1bx14p", "p23250"]
+    for wrt_full_compensation in [True, False]:
+        for varstr in varlist:
+            mtr_up = calc.mtr(varstr, wrt_full_compensation=wrt_full_compensation)[0]
+            mtr_down = calc.mtr(
+                varstr,
+                negative_finite_diff=True,
+                wrt_full_compensation=wrt_full_compensation,
+            )[0]
+            analytic = calc.payroll_mtr(varstr, wrt_full_compensation)
+            # units not near a kink have the same upward and downward rates
+            no_kink = np.isclose(mtr_up, mtr_down, rtol=0.0, atol=1e-6, equal_nan=True)
+            assert no_kink.sum() > 0.8 * calc.array_len
+            assert np.allclose(
+                analytic[no_kink],
+                mtr_up[no_kink],
+                rtol=0.0,
+                atol=1e-6,
+                equal_nan=True,
+            )
+    assert np.all(np.isnan(calc.payroll_mtr("e00200s")[calc.array("MARS") != 2]))
+    with pytest.raises(ValueError):
+        calc.payroll_mtr("bad_variable")
+
+
 def test_noreform_documentation():
     """
     Test automatic documentation creation.
@@ -697,6 +1036,25 @@ def test_diagnostic_table(cps_subsample):
     assert isinstance(adt, pd.DataFrame)
 
 
+def test_diagnostic_table_workers(aged_payroll_records):
+    """
+    Test diagnostic_table method with worker processes, which extrapolate
+    the data with advance_to_year, produces the same table as without
+    them, which extrapolates the data with increment_year.
+    """
+    recs = aged_payroll_records
+    pol = Policy()
+    pol.implement_reform({"II_em": {2021: 2000}, "SS_Earnings_c": {2022: 200000}})
+    calc = tcp.Calculator(policy=pol, records=recs)
+    adt = calc.diagnostic_table(3)
+    assert list(adt.columns) == [2020, 2021, 2022]
+    assert calc.current_year == 2020
+    # the data are extrapolated, so AGI differs from year to year
+    assert adt.loc["AGI ($b)"].nunique() == 3
+    pd.testing.assert_frame_equal(calc.diagnostic_table(3, num_workers=2), adt)
+    assert calc.current_year == 2020
+
+
 def test_mtr_graph(cps_subsample):
     """
     Test mtr_graph method.
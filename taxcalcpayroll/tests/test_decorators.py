@@ -3,6 +3,8 @@
 
 import os
 import sys
+import time
+import subprocess
 import pytest
 import importlib
 import numpy as np
@@ -10,6 +12,8 @@ from pandas import DataFrame
 from pandas.testing import assert_frame_equal
 import taxcalc
 from taxcalc.decorators import *
+import taxcalcpayroll.decorators
+from taxcalcpayroll.decorators import apply_numpy
 
 
 def test_create_apply_function_string():
@@ -334,3 +338,122 @@ def test_force_no_jit():
     # restore normal JIT operation of decorators module
     del os.environ["NOTAXCALCJIT"]
     importlib.reload(taxcalc.decorators)
+
+
+@apply_numpy
+def Magic_calc7(w, x, y, z):
+    a = x + y
+    b = w + x + y + z
+    return (a, b)
+
+
+def test_apply_numpy():
+    pm = Foo()
+    pf = Foo()
+    pm.w = np.array([2.0])
+    pf.x = np.ones((5,))
+    pf.y = np.ones((5,))
+    pf.z = np.ones((5,))
+    pf.a = np.zeros((5,))
+    pf.b = np.zeros((5,))
+    a_array = pf.a
+    ans = Magic_calc7(pm, pf)
+    assert ans is None
+    assert pf.a is a_array  # outputs are stored in place
+    assert np.allclose(pf.a, 2.0)
+    assert np.allclose(pf.b, 5.0)
+    assert Magic_calc7.__wrapped__(2.0, 1.0, 1.0, 1.0) == (2.0, 5.0)
+
+
+def Magic_calc8(x, y, z):
+    a = x + y
+    b = x + y + z
+    return (a, b)
+
+
+def test_iterate_jit_cache(tmp_path, monkeypatch):
+    """
+    Test that TCPJITCACHE turns on the on-disk caching of compiled functions.
+    """
+    monkeypatch.setenv("TCPJITCACHE", str(tmp_path))
+    Magic_calc8_ = taxcalcpayroll.decorators.iterate_jit(nopython=True)(
+        Magic_calc8
+    )
+    pm = Foo()
+    pf = Foo()
+    pf.a = np.zeros((5,))
+    pf.b = np.zeros((5,))
+    pf.x = np.ones((5,))
+    pf.y = np.ones((5,))
+    pf.z = np.ones((5,))
+    ans = Magic_calc8_(pm, pf)
+    exp = DataFrame(data=[[2.0, 3.0]] * 5, columns=["a", "b"])
+    assert_frame_equal(ans, exp)
+    modfiles = [fn for fn in os.listdir(tmp_path) if fn.endswith(".py")]
+    assert len(modfiles) == 1
+    assert modfiles[0].startswith("tcpjit_Magic_calc8_")
+    assert os.listdir(os.path.join(tmp_path, "__pycache__"))
+    # a second decoration of the same function reuses the cached module
+    Magic_calc8__ = taxcalcpayroll.decorators.iterate_jit(nopython=True)(
+        Magic_calc8
+    )
+    assert_frame_equal(Magic_calc8__(pm, pf), exp)
+    assert [fn for fn in os.listdir(tmp_path) if fn.endswith(".py")] == modfiles
+
+
+STARTUP_SCRIPT = """
+import sys
+import time
+time0 = time.time()
+import numpy as np
+import pandas as pd
+import taxcalcpayroll as tcp
+from taxcalcpayroll.policy import Policy
+from taxcalcpayroll.records import Records
+num = 1000
+rng = np.random.RandomState(1)
+sdf = pd.DataFrame()
+sdf["RECID"] = np.arange(1, num + 1)
+sdf["MARS"] = rng.choice([1, 2], size=num)
+sdf["e00200p"] = np.round(rng.uniform(0.0, 300000.0, num), 2)
+sdf["e00200"] = sdf["e00200p"]
+sdf["e00900p"] = np.round(rng.uniform(-10000.0, 200000.0, num), 2)
+sdf["e00900"] = sdf["e00900p"]
+recs = Records(data=sdf, start_year=2020, gfactors=None, weights=None)
+calc = tcp.Calculator(policy=Policy(), records=recs)
+time1 = time.time()
+getattr(calc, sys.argv[1])()
+time2 = time.time()
+print("{:.3f} {:.3f}".format(time2 - time0, time2 - time1))
+"""
+
+
+@pytest.mark.pre_release
+def test_jit_cache_startup_benchmark(tmp_path):
+    """
+    Report time to first calc_payroll() and first calc_all() in a new
+    Python process when the on-disk cache of compiled payroll functions
+    is empty (cold cache) and when it is already filled (warm cache).
+    """
+
+    def first_calc(method, cache_dir):
+        env = dict(os.environ)
+        env.pop("TESTING", None)
+        env["TCPJITCACHE"] = cache_dir
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, method],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return [float(tim) for tim in out.stdout.split()]
+
+    print("\nseconds to first calc (process total, calc method only):")
+    for method in ["calc_payroll", "calc_all"]:
+        cache_dir = str(tmp_path / method)
+        cold = first_calc(method, cache_dir)
+        warm = first_calc(method, cache_dir)
+        print("{:>12} cold cache: {:8.3f} {:8.3f}".format(method, *cold))
+        print("{:>12} warm cache: {:8.3f} {:8.3f}".format(method, *warm))
+        assert warm[1] < cold[1]
@@ -0,0 +1,47 @@
+# CODING-STYLE CHECKS:
+# pycodestyle test_payrolloffset.py
+
+import numpy as np
+import pandas as pd
+import pytest
+import taxcalc as tc
+import taxcalcpayroll as tcp
+from taxcalcpayroll.payrolloffset import (
+    employer_payroll_offset,
+    employer_payroll_offset_years,
+)
+
+
+@pytest.mark.parametrize(
+    "reform",
+    [
+        {"FICA_ss_trt_employer": {2021: 0.07}, "SS_Earnings_c": {2022: 200000.0}},
+        {"SS_Earnings_c": {2021: 200000.0}},
+    ],
+    ids=["offset", "no offset"],
+)
+def test_employer_payroll_offset_years(aged_payroll_records, reform):
+    """
+    Test employer_payroll_offset_years produces the same dataframes as
+    employer_payroll_offset called in each year.
+    """
+    recs = aged_payroll_records
+    pol = tc.Policy()
+    calc = tcp.Calculator(policy=pol, records=recs)
+    years = range(2020, 2024)
+    dfs = employer_payroll_offset_years(reform, calc, pol, recs, years)
+    assert list(dfs.keys()) == list(years)
+    for year in years:
+        calc.advance_to_year(year)
+        expected = employer_payroll_offset(reform, calc, pol, recs)
+        pd.testing.assert_frame_equal(dfs[year], expected)
+    # like Calculator.dataframe, all columns (including MARS) are float
+    dumpdf = employer_payroll_offset(reform, calc, pol, recs, dump=True)
+    assert dumpdf["MARS"].dtype == np.float64
+    assert (dumpdf.dtypes == np.float64).all()
+    # the records object passed to the function is not extrapolated
+    assert recs.current_year == 2020
+    with pytest.raises(ValueError):
+        employer_payroll_offset_years(reform, calc, pol, recs, [2019, 2020])
+    with pytest.raises(ValueError):
+        employer_payroll_offset_years(reform, calc, pol, recs, [2021, 2021])
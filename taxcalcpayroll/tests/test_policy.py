@@ -10,13 +10,16 @@ Test Policy class and its methods.
 
 import copy
 import os
+import sys
 import json
+import subprocess
 import numpy as np
 import pytest
 import paramtools as pt
 
 # pylint: disable=import-error
-from taxcalc import Policy
+from taxcalc import Policy, GrowFactors
+import taxcalcpayroll.policy
 
 
 def cmp_policy_objs(pol1, pol2, year_range=None, exclude=None):
@@ -1505,3 +1508,126 @@ class TestAdjust:
         )
 
         np.testing.assert_equal(act_before_2025, exp_before_2025)
+
+
+def test_policy_cache(tmp_path, monkeypatch):
+    """
+    Test that TCPPOLICYCACHE turns on the on-disk caching of the
+    current-law policy parameters and that a Policy object loaded from
+    the cache is the same as one made from the defaults JSON file.
+    """
+    TCPPolicy = taxcalcpayroll.policy.Policy
+    pol0 = TCPPolicy()
+    monkeypatch.setenv("TCPPOLICYCACHE", str(tmp_path))
+    pol1 = TCPPolicy()  # makes the cache file
+    cache_name = "policy-{}.pkl".format(TCPPolicy.cache_key())
+    assert os.listdir(tmp_path) == [cache_name]
+    pol2 = TCPPolicy()  # loads the cache file
+    reform = {"II_em": {2022: 1000}, "SS_Earnings_c": {2024: 200000}}
+    for pol in [pol0, pol1, pol2]:
+        pol.implement_reform(reform)
+        pol.set_year(2026)
+    for name in TCPPolicy.parameter_list():
+        assert np.array_equal(getattr(pol2, "_" + name), getattr(pol0, "_" + name))
+        assert np.array_equal(getattr(pol1, "_" + name), getattr(pol0, "_" + name))
+    # cached Policy objects still validate reforms
+    with pytest.raises(pt.ValidationError):
+        TCPPolicy().implement_reform({"II_em": {2022: -1000}})
+    # construction with gfactors uses a different cache file
+    pol3 = TCPPolicy(gfactors=GrowFactors())
+    assert len(os.listdir(tmp_path)) == 2
+    pol3 = TCPPolicy(gfactors=GrowFactors())
+    assert np.array_equal(pol3._SS_Earnings_c, Policy()._SS_Earnings_c)
+    # unreadable cache file is ignored
+    with open(os.path.join(tmp_path, cache_name), "w") as cfile:
+        cfile.write("not a pickle file")
+    pol4 = TCPPolicy()
+    assert np.array_equal(pol4._SS_Earnings_c, Policy()._SS_Earnings_c)
+    # numpy version that pickled the cached arrays is in the cache key
+    cache_key = TCPPolicy.cache_key()
+    monkeypatch.setattr(np, "__version__", "0.0.0")
+    assert TCPPolicy.cache_key() != cache_key
+
+
+@pytest.mark.parametrize("cls", ["taxcalc", "taxcalcpayroll"])
+def test_policy_clone(cls):
+    """
+    Test that Policy.clone makes the same independent copy as deepcopy.
+    """
+    TCPPolicy = taxcalcpayroll.policy.Policy
+    pol = Policy() if cls == "taxcalc" else TCPPolicy()
+    pol.set_year(2020)
+    clone = TCPPolicy.clone(pol)
+    if cls == "taxcalc":
+        dcopy = copy.deepcopy(pol)
+    else:
+        # deepcopy of a taxcalcpayroll Policy object is a clone, so compare
+        # with a new taxcalc Policy object instead
+        assert type(copy.deepcopy(pol)) is type(pol)
+        dcopy = Policy()
+        dcopy.set_year(2020)
+    assert type(clone) is type(pol)
+    assert clone.current_year == 2020
+    reform = {
+        "SS_Earnings_c": {2022: 200000},
+        "FICA_ss_trt_employer": {2023: 0.07},
+        "parameter_indexing_CPI_offset": {2021: -0.001},
+    }
+    clone.implement_reform(reform)
+    dcopy.implement_reform(reform)
+    for pol_ in [pol, clone, dcopy]:
+        pol_.set_year(2030)
+    assert clone._data == dcopy._data
+    for name in TCPPolicy.parameter_list():
+        assert np.array_equal(getattr(clone, name), getattr(dcopy, name))
+    # the original Policy object is unchanged
+    assert np.array_equal(pol._SS_Earnings_c, Policy()._SS_Earnings_c)
+    assert pol._FICA_ss_trt_employer[-1] == 0.062
+    # a clone still validates reforms
+    with pytest.raises(pt.ValidationError):
+        TCPPolicy.clone(pol).implement_reform({"II_em": {2032: -1000}})
+
+
+POLICY_STARTUP_SCRIPT = """
+import time
+time0 = time.time()
+from taxcalcpayroll.policy import Policy
+time1 = time.time()
+Policy()
+time2 = time.time()
+Policy()
+time3 = time.time()
+print("{:.3f} {:.3f}".format(time2 - time1, time3 - time2))
+"""
+
+
+@pytest.mark.pre_release
+def test_policy_cache_startup_benchmark(tmp_path):
+    """
+    Report time for first and second Policy() construction in a new
+    Python process without the policy cache, with an empty (cold) cache,
+    and with an already filled (warm) cache.
+    """
+
+    def construct(cache_dir):
+        env = dict(os.environ)
+        env.pop("TCPPOLICYCACHE", None)
+        if cache_dir:
+            env["TCPPOLICYCACHE"] = cache_dir
+        out = subprocess.run(
+            [sys.executable, "-c", POLICY_STARTUP_SCRIPT],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return [float(tim) for tim in out.stdout.split()]
+
+    nocache = construct("")
+    cold = construct(str(tmp_path))
+    warm = construct(str(tmp_path))
+    print("\nseconds for Policy() construction (first, second):")
+    print("   no cache: {:8.3f} {:8.3f}".format(*nocache))
+    print(" cold cache: {:8.3f} {:8.3f}".format(*cold))
+    print(" warm cache: {:8.3f} {:8.3f}".format(*warm))
+    assert warm[0] < nocache[0]
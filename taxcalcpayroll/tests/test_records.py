@@ -9,6 +9,8 @@ import pandas as pd
 import pytest
 from io import StringIO
 from taxcalc import GrowFactors, Policy, Records, Calculator
+import taxcalcpayroll as tcp
+from taxcalcpayroll.records import Records as NpyRecords, compact_precision_report
 
 
 def test_incorrect_Records_instantiation(cps_subsample):
@@ -197,3 +199,145 @@ def test_csv_input_vars_md_contents(tests_path):
         for var in valid_less_civ:
             msg += "VARIABLE= {}\n".format(var)
         raise ValueError(msg)
+
+
+def test_npy_dir_records(payroll_sample, tmp_path):
+    """
+    Test Records constructed from a directory of memory-mapped .npy files
+    give the same results as Records constructed from a DataFrame.
+    """
+    npydir = str(tmp_path / "npy")
+    written = NpyRecords.write_npy_dir(payroll_sample, npydir)
+    assert sorted(written) == sorted(
+        set(payroll_sample.columns) & Records(data=None).USABLE_READ_VARS
+    )
+    weights = pd.DataFrame(
+        {
+            "WT{}".format(year): np.full(len(payroll_sample), 100)
+            for year in range(2020, 2024)
+        }
+    )
+    kwargs = dict(gfactors=GrowFactors(), weights=weights, adjust_ratios=None)
+    recs1 = NpyRecords(data=payroll_sample, start_year=2020, **kwargs)
+    recs2 = NpyRecords(data=npydir, start_year=2020, **kwargs)
+    # input variables are read-only and calculated variables are lazy
+    assert isinstance(recs2.e00200, np.memmap)
+    assert not recs2.e00200.flags.writeable
+    assert "iitax" not in vars(recs2)
+    assert np.all(recs2.iitax == 0.0)
+    assert "iitax" in vars(recs2)
+    with pytest.raises(AttributeError):
+        recs2.unknown_variable
+    calc1 = tcp.Calculator(policy=Policy(), records=recs1)
+    calc2 = tcp.Calculator(policy=Policy(), records=recs2)
+    assert np.shares_memory(calc2.array("e00200"), recs2.e00200)
+    for year in range(2020, 2023):
+        if year > 2020:
+            calc1.increment_year()
+            calc2.increment_year()
+        calc1.calc_all()
+        calc2.calc_all()
+        assert calc1.dataframe(None, all_vars=True).equals(
+            calc2.dataframe(None, all_vars=True)
+        )
+    # aging calc2 data leaves the memory-mapped input variables unchanged
+    assert np.array_equal(recs2.e00200, payroll_sample["e00200"].values)
+    # missing MUST_READ_VARS
+    os.remove(os.path.join(npydir, "MARS.npy"))
+    with pytest.raises(ValueError):
+        NpyRecords(data=npydir, start_year=2020, gfactors=None, weights=None)
+
+
+def test_records_data_index(payroll_sample, tmp_path):
+    """
+    Test Records objects whose input variables are read from a directory
+    of .npy column files or projected on output_vars have the same
+    number of records and the same subsample weights as those whose data
+    are read as in the Tax-Calculator's Records class.
+    """
+    npydir = str(tmp_path / "npy")
+    subsample = payroll_sample.iloc[::2]
+    NpyRecords.write_npy_dir(subsample, npydir)
+    weights = pd.DataFrame(
+        {"WT{}".format(yr): payroll_sample["s006"] * 100 for yr in range(2020, 2023)}
+    )
+    kwargs = dict(start_year=2020, gfactors=GrowFactors(), weights=weights)
+    # the records of a directory of .npy column files have a RangeIndex
+    for data, tc_data in [
+        (npydir, subsample.reset_index(drop=True)),
+        (subsample, subsample),
+    ]:
+        recs = NpyRecords(data=data, output_vars=["payrolltax"], **kwargs)
+        tc_recs = Records(data=tc_data, **kwargs)
+        assert recs.array_length == len(subsample.index)
+        assert "iitax" not in vars(recs)  # because it is allocated lazily
+        for _ in range(2):
+            assert np.allclose(recs.s006, tc_recs.s006)
+            recs.increment_year()
+            tc_recs.increment_year()
+
+
+def test_output_vars_records(payroll_sample):
+    """
+    Test Records that read only the input variables needed to calculate
+    the payroll-tax variables give the same payroll-tax results.
+    """
+    weights = pd.DataFrame(
+        {
+            "WT{}".format(year): np.full(len(payroll_sample), 100)
+            for year in range(2020, 2024)
+        }
+    )
+    kwargs = dict(
+        start_year=2020, gfactors=GrowFactors(), weights=weights, adjust_ratios=None
+    )
+    outputs = tcp.Calculator.PAYROLL_VARIABLES
+    recs1 = NpyRecords(data=payroll_sample, **kwargs)
+    recs2 = NpyRecords(data=payroll_sample, output_vars=outputs, **kwargs)
+    assert "e00200p" in vars(recs2)
+    assert "e00300" not in vars(recs2)
+    assert "e00300" in recs2.IGNORED_VARS
+    calc1 = tcp.Calculator(policy=Policy(), records=recs1)
+    calc2 = tcp.Calculator(policy=Policy(), records=recs2)
+    calc1.advance_to_year(2023)
+    calc2.advance_to_year(2023)
+    assert "e00300" not in vars(recs2)
+    calc1.calc_all()
+    calc2.calc_payroll()
+    for var in outputs:
+        assert np.array_equal(calc1.array(var), calc2.array(var))
+    with pytest.raises(ValueError):
+        NpyRecords(data=payroll_sample, output_vars=["unknown_variable"], **kwargs)
+
+
+def test_compact_records(payroll_sample):
+    """
+    Test compact Records store small input arrays and give nearly the
+    same results as float64 Records.
+    """
+    recs1 = NpyRecords(
+        data=payroll_sample, start_year=2020, gfactors=None, weights=None
+    )
+    recs2 = NpyRecords(
+        data=payroll_sample, start_year=2020, gfactors=None, weights=None, compact=True
+    )
+    for var in ["MARS", "XTOT", "EIC", "n24", "age_head"]:
+        assert getattr(recs2, var).dtype == np.int8
+        assert np.array_equal(getattr(recs2, var), getattr(recs1, var))
+    assert recs2.RECID.dtype == np.int32
+    for var in recs1.USABLE_READ_VARS - recs1.INTEGER_READ_VARS:
+        assert np.allclose(
+            getattr(recs2, var), getattr(recs1, var), rtol=0.0, atol=0.005
+        )
+    report = compact_precision_report(
+        Policy(),
+        num_years=2,
+        data=payroll_sample,
+        start_year=2020,
+        gfactors=None,
+        weights=None,
+    )
+    assert list(report["year"]) == [2020, 2020, 2021, 2021]
+    assert list(report["variable"]) == ["payrolltax", "iitax"] * 2
+    assert np.allclose(report["relative_difference"], 0.0, atol=1e-8)
+    assert np.all(report["max_unit_difference"] < 0.1)
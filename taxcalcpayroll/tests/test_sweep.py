@@ -0,0 +1,106 @@
+# CODING-STYLE CHECKS:
+# pycodestyle test_sweep.py
+
+import itertools
+import numpy as np
+import pytest
+import taxcalcpayroll as tcp
+from taxcalcpayroll.policy import Policy
+from taxcalcpayroll import sweep as sweep_module
+from taxcalcpayroll.sweep import payroll_sweep
+
+
+def test_payroll_sweep(payroll_records):
+    """
+    Test payroll_sweep results are the same as calc_payroll_batch results.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    grid = {
+        "FICA_ss_trt_employer": [0.062, 0.07],
+        "SS_Earnings_c": [137700.0, 200000.0, 9e99],
+        "SS_Earnings_thd": [250000.0, 9e99],
+        "AMEDT_rt": [0.009, 0.012],
+    }
+    sweep, arrays = payroll_sweep(calc, grid, arrays=True)
+    points = list(itertools.product(*grid.values()))
+    assert list(sweep.columns) == list(grid.keys()) + ["payrolltax"]
+    assert len(sweep.index) == len(points)
+    assert arrays.shape == (len(points), calc.array_len)
+    reforms = [
+        {pname: {2020: val} for pname, val in zip(grid.keys(), point)}
+        for point in points
+    ]
+    batch = calc.calc_payroll_batch(reforms, variables=["payrolltax"])
+    for idx in range(len(points)):
+        expected = batch.loc[idx]["payrolltax"].values
+        assert np.allclose(arrays[idx], expected, rtol=0.0, atol=1e-9)
+        revenue = (expected * calc.array("s006")).sum()
+        assert np.allclose(sweep["payrolltax"][idx], revenue)
+    # revenue only output
+    revenue_only = payroll_sweep(calc, grid)
+    assert np.allclose(revenue_only["payrolltax"], sweep["payrolltax"])
+    # sweep leaves calc unchanged
+    assert np.allclose(calc.array("payrolltax"), 0.0)
+
+
+def test_payroll_sweep_cache_size(payroll_records, monkeypatch):
+    """
+    Test payroll_sweep keeps at most cache_size values of each kind of
+    earnings component without changing the results.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    grid = {
+        "FICA_ss_trt_employer": [0.062, 0.07, 0.08],
+        "FICA_mc_trt_employee": [0.0145, 0.02],
+        "SS_Earnings_c": [137700.0, 150000.0, 200000.0, 9e99],
+        "SS_Earnings_thd": [250000.0, 300000.0, 400000.0, 9e99],
+        "AMEDT_rt": [0.009, 0.012],
+    }
+    num_points = 3 * 2 * 4 * 4 * 2
+    components = list()
+    max_sizes = dict()
+
+    class RecordingComponents(sweep_module._PayrollComponents):
+        """
+        _PayrollComponents that records the largest number of cached
+        values of each kind of component.
+        """
+
+        def __init__(self, *args):
+            super().__init__(*args)
+            components.append(self)
+
+        def _cached(self, key, func):
+            value = super()._cached(key, func)
+            size = len(self.cache[key[0]])
+            max_sizes[key[0]] = max(size, max_sizes.get(key[0], 0))
+            return value
+
+    monkeypatch.setattr(sweep_module, "_PayrollComponents", RecordingComponents)
+    expected = payroll_sweep(calc, grid, cache_size=num_points)
+    assert max_sizes["txsey"] == 3 * 2 * 4
+    for cache_size in [1, 2]:
+        max_sizes.clear()
+        sweep = payroll_sweep(calc, grid, cache_size=cache_size)
+        assert set(max_sizes) == {"was", "sey", "txsey", "extra", "amc"}
+        assert max(max_sizes.values()) == cache_size
+        assert len(components[-1].cache) == 5
+        assert sweep.equals(expected)
+    with pytest.raises(ValueError):
+        payroll_sweep(calc, grid, cache_size=0)
+
+
+def test_payroll_sweep_errors(payroll_records):
+    """
+    Test payroll_sweep raises errors for invalid grid arguments.
+    """
+    recs = payroll_records
+    calc = tcp.Calculator(policy=Policy(), records=recs, vectorized=True)
+    with pytest.raises(ValueError):
+        payroll_sweep(calc, {})
+    with pytest.raises(ValueError):
+        payroll_sweep(calc, {"II_em": [0.0]})
+    with pytest.raises(ValueError):
+        payroll_sweep(calc, {"AMEDT_rt": []})
@@ -9,11 +9,17 @@ Tests for Tax-Calculator TaxCalcIO class.
 # pylint: disable=too-many-lines
 
 import os
+import filecmp
+import sqlite3
 from io import StringIO
 import tempfile
 import pytest
+import numpy as np
 import pandas as pd
 from taxcalc import TaxCalcIO  # pylint: disable=import-error
+import taxcalcpayroll as tcp
+from taxcalcpayroll import taxcalcio
+from taxcalcpayroll.tcp import cli_tcp_main
 
 
 RAWINPUT = "RECID,MARS\n" "    1,   2\n" "    2,   1\n" "    3,   4\n" "    4,   3\n"
@@ -830,3 +836,435 @@ def test_error_message_parsed_correctly(regression_reform_file):
     assert isinstance(tcio.errmsg, str) and tcio.errmsg
     exp_errmsg = "AMEDT_rt[year=2021] 1.8 > max 1 \n" "AMEDT_rt[year=2021] 1.8 > max 1 "
     assert tcio.errmsg == exp_errmsg
+
+
+def test_chunked_analysis(reformfile1, payroll_sample):
+    """
+    Test chunked TaxCalcIO analysis writes the same output as unchunked.
+    """
+    taxyear = 2021
+    outfiles = list()
+    for chunk_size in [None, 700]:
+        outdir = tempfile.mkdtemp()
+        tcpio = tcp.TaxCalcIO(
+            input_data=payroll_sample,
+            tax_year=taxyear,
+            baseline=None,
+            reform=reformfile1.name,
+            assump=None,
+            outdir=outdir,
+        )
+        assert not tcpio.errmsg
+        tcpio.init(
+            input_data=payroll_sample,
+            tax_year=taxyear,
+            baseline=None,
+            reform=reformfile1.name,
+            assump=None,
+            aging_input_data=False,
+            exact_calculations=False,
+            chunk_size=chunk_size,
+        )
+        assert not tcpio.errmsg
+        dumpvars = set(["RECID", "FLPDYR", "e00200", "payrolltax", "iitax"])
+        tcpio.analyze(
+            writing_output_file=True,
+            dump_varset=dumpvars,
+            output_dump=True,
+            output_sqldb=True,
+        )
+        outfiles.append(tcpio._output_filename)  # pylint: disable=protected-access
+    assert filecmp.cmp(outfiles[0], outfiles[1], shallow=False)
+    for table in ["baseline", "reform"]:
+        tables = list()
+        for outfile in outfiles:
+            dbcon = sqlite3.connect(outfile.replace(".csv", ".db"))
+            tables.append(pd.read_sql("SELECT * FROM {}".format(table), dbcon))
+            dbcon.close()
+        assert len(tables[0].index) == len(payroll_sample.index)
+        pd.testing.assert_frame_equal(tables[0], tables[1])
+    # chunked analysis cannot write tables
+    with pytest.raises(ValueError):
+        tcpio.analyze(output_tables=True)
+    tcpio.init(
+        input_data=payroll_sample,
+        tax_year=taxyear,
+        baseline=None,
+        reform=None,
+        assump=None,
+        aging_input_data=False,
+        exact_calculations=False,
+        chunk_size=0,
+    )
+    assert tcpio.errmsg
+
+
+def test_parallel_cli(reformfile1, payroll_sample, monkeypatch):
+    """
+    Test tcp --workers option writes the same output as one process.
+    """
+    # pylint: disable=too-many-locals
+    tmpdir = tempfile.mkdtemp()
+    inputfn = os.path.join(tmpdir, "sample.csv")
+    payroll_sample.to_csv(inputfn, index=False)
+    dvarsfn = os.path.join(tmpdir, "dvars.txt")
+    with open(dvarsfn, "w") as dfile:
+        dfile.write("RECID FLPDYR e00200 payrolltax iitax\n")
+    outfiles = list()
+    for workers in [1, 3]:
+        outdir = os.path.join(tmpdir, str(workers))
+        os.mkdir(outdir)
+        argv = [
+            "tcp",
+            inputfn,
+            "2021",
+            "--reform",
+            reformfile1.name,
+            "--dump",
+            "--dvars",
+            dvarsfn,
+            "--sqldb",
+            "--outdir",
+            outdir,
+            "--workers",
+            str(workers),
+        ]
+        monkeypatch.setattr("sys.argv", argv)
+        assert cli_tcp_main() == 0
+        csvfiles = [fn for fn in os.listdir(outdir) if fn.endswith(".csv")]
+        assert len(csvfiles) == 1
+        outfiles.append(os.path.join(outdir, csvfiles[0]))
+    assert filecmp.cmp(outfiles[0], outfiles[1], shallow=False)
+    for table in ["baseline", "reform"]:
+        tables = list()
+        for outfile in outfiles:
+            dbcon = sqlite3.connect(outfile.replace(".csv", ".db"))
+            tables.append(pd.read_sql("SELECT * FROM {}".format(table), dbcon))
+            dbcon.close()
+        assert len(tables[0].index) == len(payroll_sample.index)
+        pd.testing.assert_frame_equal(tables[0], tables[1][tables[0].columns])
+    # invalid --workers uses
+    for badargs in [["--workers", "0"], ["--workers", "2", "--tables"]]:
+        monkeypatch.setattr("sys.argv", ["tcp", inputfn, "2021"] + badargs)
+        assert cli_tcp_main() == 1
+
+
+def test_parallel_cli_empty_input(payroll_sample, monkeypatch):
+    """
+    Test tcp --workers option analyzes an INPUT file without rows in one
+    process.
+    """
+    tmpdir = tempfile.mkdtemp()
+    inputfn = os.path.join(tmpdir, "empty.csv")
+    payroll_sample.iloc[:0].to_csv(inputfn, index=False)
+    argv = ["tcp", inputfn, "2021", "--dump", "--outdir", tmpdir, "--workers", "3"]
+    monkeypatch.setattr("sys.argv", argv)
+    assert cli_tcp_main() == 0
+    csvfiles = [fn for fn in os.listdir(tmpdir) if fn.endswith("-#-#-#.csv")]
+    assert len(csvfiles) == 1
+    assert pd.read_csv(os.path.join(tmpdir, csvfiles[0])).empty
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_columnar_dump(reformfile1, payroll_sample, output_format):
+    """
+    Test columnar dump output contains the same values as CSV dump output.
+    """
+    pytest.importorskip("pyarrow")
+    taxyear = 2021
+    dumpvars = set(["RECID", "FLPDYR", "e00200", "payrolltax", "mtr_paytax"])
+    dfs = list()
+    for fmt, chunk_size in [("csv", None), (output_format, None), (output_format, 700)]:
+        tcpio = tcp.TaxCalcIO(
+            input_data=payroll_sample,
+            tax_year=taxyear,
+            baseline=None,
+            reform=reformfile1.name,
+            assump=None,
+            outdir=tempfile.mkdtemp(),
+        )
+        tcpio.init(
+            input_data=payroll_sample,
+            tax_year=taxyear,
+            baseline=None,
+            reform=reformfile1.name,
+            assump=None,
+            aging_input_data=False,
+            exact_calculations=False,
+            chunk_size=chunk_size,
+        )
+        assert not tcpio.errmsg
+        tcpio.analyze(
+            writing_output_file=True,
+            dump_varset=dumpvars,
+            output_dump=True,
+            output_format=fmt,
+        )
+        dumpfile = tcpio.dump_filename()
+        assert dumpfile.endswith(".{}".format(fmt))
+        if fmt == "csv":
+            dfs.append(pd.read_csv(dumpfile))
+        elif fmt == "parquet":
+            dfs.append(pd.read_parquet(dumpfile))
+        else:
+            dfs.append(pd.read_feather(dumpfile))
+    assert len(dfs[0].index) == len(payroll_sample.index)
+    for dfx in dfs[1:]:
+        assert list(dfx.columns) == list(dfs[0].columns)
+        pd.testing.assert_frame_equal(dfx, dfs[0], check_dtype=False)
+    # invalid format and compression arguments
+    with pytest.raises(ValueError):
+        tcpio.analyze(output_dump=True, output_format="xlsx")
+    with pytest.raises(ValueError):
+        tcpio.analyze(output_dump=True, output_format="feather", compression="gzip")
+
+
+@pytest.mark.parametrize("ext", [".parquet", ".feather", ".npz"])
+def test_columnar_input(payroll_sample, ext):
+    """
+    Test Parquet, Feather and .npz INPUT files produce the same output
+    as the same INPUT data in a DataFrame.
+    """
+    # pylint: disable=too-many-locals
+    if ext != ".npz":
+        pytest.importorskip("pyarrow")
+    taxyear = 2021
+    tmpdir = tempfile.mkdtemp()
+    inputdf = payroll_sample.copy()
+    inputdf["unused"] = 1  # not a Records variable, so it is never read
+    inputfn = os.path.join(tmpdir, "sample" + ext)
+    if ext == ".parquet":
+        inputdf.to_parquet(inputfn)
+    elif ext == ".feather":
+        inputdf.to_feather(inputfn)
+    else:
+        np.savez(inputfn, **{name: inputdf[name].values for name in inputdf})
+    data = tcp.read_input_file(inputfn)
+    assert "unused" not in data
+    assert len(data.columns) == len(payroll_sample.columns)
+    dumpvars = set(["RECID", "FLPDYR", "e00200", "payrolltax", "iitax"])
+    outfiles = list()
+    for input_data in [payroll_sample, inputfn]:
+        outdir = tempfile.mkdtemp()
+        tcpio = tcp.TaxCalcIO(
+            input_data=input_data,
+            tax_year=taxyear,
+            baseline=None,
+            reform=None,
+            assump=None,
+            outdir=outdir,
+        )
+        assert not tcpio.errmsg
+        assert tcpio.count_input_rows(input_data) == len(payroll_sample.index)
+        tcpio.init(
+            input_data=input_data,
+            tax_year=taxyear,
+            baseline=None,
+            reform=None,
+            assump=None,
+            aging_input_data=False,
+            exact_calculations=False,
+        )
+        assert not tcpio.errmsg
+        tcpio.analyze(
+            writing_output_file=True, dump_varset=dumpvars, output_dump=True
+        )
+        outfiles.append(tcpio._output_filename)  # pylint: disable=protected-access
+    assert os.path.basename(outfiles[1]) == "sample-21-#-#-#.csv"
+    assert filecmp.cmp(outfiles[0], outfiles[1], shallow=False)
+    # nonexistent INPUT file
+    tcpio = tcp.TaxCalcIO(
+        input_data=os.path.join(tmpdir, "nonexistent" + ext),
+        tax_year=taxyear,
+        baseline=None,
+        reform=None,
+        assump=None,
+    )
+    assert tcpio.errmsg
+
+
+@pytest.mark.parametrize("ext", [".parquet", ".feather", ".npz", "-z.npz"])
+def test_columnar_input_row_range(payroll_sample, ext, monkeypatch):
+    """
+    Test chunked analysis of a row_range of a Parquet, Feather or .npz
+    INPUT file reads only the rows in that range.
+    """
+    # pylint: disable=too-many-locals
+    if not ext.endswith(".npz"):
+        pytest.importorskip("pyarrow")
+    tmpdir = tempfile.mkdtemp()
+    inputfn = os.path.join(tmpdir, "sample" + ext)
+    if ext == ".parquet":
+        payroll_sample.to_parquet(inputfn, row_group_size=300)
+    elif ext == ".feather":
+        payroll_sample.to_feather(inputfn, chunksize=300)
+    else:
+        savez = np.savez if ext == ".npz" else np.savez_compressed
+        savez(inputfn, **{name: payroll_sample[name].values for name in payroll_sample})
+    start, stop, chunk_size = 650, 1100, 200
+
+    def no_read_input_file(filepath):
+        raise AssertionError("whole INPUT file read")
+
+    batch_rows = list()
+
+    def counted_batches(batches, *args):
+        for batch in batches:
+            batch_rows.append(batch.num_rows)
+            yield batch
+
+    whole_arrays = list()
+    read_array = np.lib.format.read_array
+
+    def recorded_read_array(*args, **kwargs):
+        whole_arrays.append(args)
+        return read_array(*args, **kwargs)
+
+    opened_ranges = list()
+    columnar_input_blocks = taxcalcio._columnar_input_blocks
+
+    def recorded_input_blocks(filepath, start, stop, block_size):
+        opened_ranges.append((start, stop))
+        return columnar_input_blocks(filepath, start, stop, block_size)
+
+    sliced_batches = taxcalcio._sliced_batches
+    monkeypatch.setattr(taxcalcio, "read_input_file", no_read_input_file)
+    monkeypatch.setattr(taxcalcio, "_columnar_input_blocks", recorded_input_blocks)
+    monkeypatch.setattr(np.lib.format, "read_array", recorded_read_array)
+    monkeypatch.setattr(
+        taxcalcio,
+        "_sliced_batches",
+        lambda batches, *args: sliced_batches(counted_batches(batches), *args),
+    )
+    tcpio = tcp.TaxCalcIO(
+        input_data=inputfn,
+        tax_year=2021,
+        baseline=None,
+        reform=None,
+        assump=None,
+        outdir=tmpdir,
+    )
+    tcpio.init(
+        input_data=inputfn,
+        tax_year=2021,
+        baseline=None,
+        reform=None,
+        assump=None,
+        aging_input_data=False,
+        exact_calculations=False,
+        chunk_size=chunk_size,
+        row_range=(start, stop),
+    )
+    assert not tcpio.errmsg
+    batch_rows.clear()
+    blocks = list(tcpio._input_blocks((start, stop)))  # pylint: disable=W0212
+    first_row = start
+    for row, block in blocks:
+        assert row == first_row
+        assert 0 < len(block.index) <= chunk_size
+        first_row += len(block.index)
+    assert first_row == stop
+    data = pd.concat([block for _, block in blocks], ignore_index=True)
+    expect = payroll_sample.iloc[start:stop].reset_index(drop=True)
+    pd.testing.assert_frame_equal(data, expect[data.columns], check_dtype=False)
+    if ext.endswith(".npz"):
+        assert not batch_rows
+        assert not whole_arrays
+    elif ext == ".parquet":
+        # only the two 300-row row groups that overlap the range are read
+        assert sum(batch_rows) == 600
+    else:
+        # no 300-row record batch after the range is read
+        assert batch_rows == [300, 300, 300, 300]
+    tcpio.analyze(writing_output_file=True, output_dump=True)
+    assert len(pd.read_csv(tcpio._output_filename).index) == stop - start
+    # analyze reuses the first block read by init instead of reading the
+    # INPUT again, so the INPUT is read once by init and once above
+    assert opened_ranges == [(start, stop), (start, stop)]
+
+
+def test_sqldb_append(reformfile1, payroll_sample):
+    """
+    Test TaxCalcIO sqldb_file option appends several reforms and tax years
+    to the same SQLite3 database file.
+    """
+    dbfile = os.path.join(tempfile.mkdtemp(), "all.db")
+    dumpvars = set(["RECID", "FLPDYR", "e00200", "payrolltax"])
+    runs = [(2021, None), (2022, None), (2021, reformfile1.name), (2021, None)]
+    for taxyear, reform in runs:
+        tcpio = tcp.TaxCalcIO(
+            input_data=payroll_sample,
+            tax_year=taxyear,
+            baseline=None,
+            reform=reform,
+            assump=None,
+            outdir=tempfile.mkdtemp(),
+        )
+        tcpio.init(
+            input_data=payroll_sample,
+            tax_year=taxyear,
+            baseline=None,
+            reform=reform,
+            assump=None,
+            aging_input_data=False,
+            exact_calculations=False,
+        )
+        assert not tcpio.errmsg
+        tcpio.analyze(dump_varset=dumpvars, output_sqldb=True, sqldb_file=dbfile)
+    dbcon = sqlite3.connect(dbfile)
+    counts = dbcon.execute(
+        "SELECT REFORM, YEAR, COUNT(*) FROM reform GROUP BY REFORM, YEAR"
+    ).fetchall()
+    refname = os.path.splitext(os.path.basename(reformfile1.name))[0]
+    num = len(payroll_sample.index)
+    expected = [
+        ("#-#-#", 2021, num),
+        ("#-#-#", 2022, num),
+        ("#-{}-#".format(refname), 2021, num),
+    ]
+    assert sorted(counts) == sorted(expected)
+    # the rerun replaced the earlier rows with the same key
+    table = pd.read_sql(
+        "SELECT * FROM baseline WHERE REFORM = '#-#-#' AND YEAR = 2021", dbcon
+    )
+    assert table["RECID"].tolist() == payroll_sample["RECID"].tolist()
+    assert (table["FLPDYR"] == 2021).all()
+    indexes = dbcon.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'reform'"
+    ).fetchall()
+    assert sorted(indexes) == [("reform_RECID",), ("reform_YEAR",)]
+    dbcon.close()
+
+
+@pytest.mark.parametrize(
+    "dumpvars", [None, set(["RECID", "MARS", "e00200", "payrolltax", "mtr_paytax"])]
+)
+def test_dump_output(payroll_sample, dumpvars):
+    """
+    Test TaxCalcIO dump_output method returns the same DataFrame as the
+    Tax-Calculator dump_output method, except for the column order.
+    """
+    tcpio = tcp.TaxCalcIO(
+        input_data=payroll_sample,
+        tax_year=2021,
+        baseline=None,
+        reform=None,
+        assump=None,
+        outdir=tempfile.mkdtemp(),
+    )
+    tcpio.init(
+        input_data=payroll_sample,
+        tax_year=2021,
+        baseline=None,
+        reform=None,
+        assump=None,
+        aging_input_data=False,
+        exact_calculations=False,
+    )
+    assert not tcpio.errmsg
+    tcpio.calc.calc_all()
+    mtr = np.linspace(0.0, 0.5, tcpio.calc.array_len)
+    dump = tcpio.dump_output(tcpio.calc, dumpvars, mtr, mtr)
+    expected = TaxCalcIO.dump_output(tcpio, tcpio.calc, dumpvars, mtr, mtr)
+    assert list(dump.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(dump, expected[dump.columns])